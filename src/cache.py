@@ -0,0 +1,137 @@
+# src/cache.py
+from __future__ import annotations
+
+import hashlib, json, os, pickle, time
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+# Default code version: every module of the core library.
+_SRC_DIR = Path(__file__).resolve().parent
+
+
+def code_version(paths: Iterable[str | os.PathLike] = ()) -> str:
+    """Hash of the source code a cell depends on.
+
+    Parameters
+    ----------
+    paths : iterable of path-like
+        Extra files (e.g. the calling CLI module) hashed together with all
+        `src/*.py` modules.
+
+    Returns
+    -------
+    str
+        Hex digest (16 chars); any edit to these files invalidates the cells.
+    """
+    h = hashlib.sha256()
+    for p in sorted({*map(str, _SRC_DIR.glob("*.py")), *map(lambda q: str(Path(q).resolve()), paths)}):
+        h.update(Path(p).name.encode())
+        h.update(Path(p).read_bytes())
+    return h.hexdigest()[:16]
+
+
+def _jsonable(obj: Any) -> Any:
+    # Canonical JSON for keys: numpy scalars/arrays → Python, inf/nan as strings.
+    if hasattr(obj, "tolist"):
+        obj = obj.tolist()
+    if isinstance(obj, float) and (obj != obj or obj in (float("inf"), float("-inf"))):
+        return repr(obj)
+    if isinstance(obj, dict):
+        return {str(k): _jsonable(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_jsonable(v) for v in obj]
+    return obj
+
+
+class CellCache:
+    """Content-addressed store of finished simulation cells.
+
+    Each cell is keyed by sha256(kind, parameters, code version): the
+    parameters must include the seed and everything else the result depends
+    on. Results are pickled to ``<root>/cells/<key>.pkl`` (written to a temp
+    file and renamed, so a killed run never leaves a partial cell) and then
+    recorded as one JSON line in ``<root>/manifest.jsonl``. A cell counts as
+    done when it is in the manifest and its file exists; re-runs skip such
+    cells and recompute missing or invalidated ones (e.g. after a code edit,
+    which changes every key).
+
+    Parameters
+    ----------
+    root : str
+        Cache directory (created on demand).
+    code : str, optional
+        Code version string; defaults to `code_version()` of the core library.
+        Pass an explicit value to share one hash across pool workers.
+
+    Notes
+    -----
+    Pool workers may `put` concurrently: cell files are renamed atomically and
+    each manifest record is a single short append (O_APPEND).
+    """
+
+    def __init__(self, root: str, code: str | None = None):
+        self.root = Path(root)
+        self.code = code if code is not None else code_version()
+        (self.root / "cells").mkdir(parents=True, exist_ok=True)
+        self.manifest = self.root / "manifest.jsonl"
+        self._done = self._read_manifest()
+
+    def _read_manifest(self) -> set[str]:
+        if not self.manifest.exists():
+            return set()
+        done = set()
+        for line in self.manifest.read_text().splitlines():
+            try:
+                done.add(json.loads(line)["key"])
+            except (ValueError, KeyError):
+                continue  # tolerate a torn last line from a killed run
+        return done
+
+    def key(self, kind: str, params: dict) -> str:
+        """Content address of a cell."""
+        blob = json.dumps({"kind": kind, "params": _jsonable(params), "code": self.code},
+                          sort_keys=True)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / "cells" / f"{key}.pkl"
+
+    def has(self, key: str) -> bool:
+        return key in self._done and self._path(key).exists()
+
+    def get(self, key: str) -> Any:
+        """Load a finished cell (KeyError if it is not done)."""
+        if not self.has(key):
+            raise KeyError(key)
+        with open(self._path(key), "rb") as fh:
+            return pickle.load(fh)
+
+    def put(self, key: str, value: Any, kind: str = "", params: dict | None = None) -> None:
+        """Store a cell atomically, then record it in the manifest."""
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "wb") as fh:
+            pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        rec = json.dumps({"key": key, "kind": kind, "params": _jsonable(params or {}),
+                          "code": self.code, "time": time.time()}, sort_keys=True)
+        with open(self.manifest, "a+b") as fh:
+            # A killed run may have left a torn last line: start on a fresh one.
+            fh.seek(0, os.SEEK_END)
+            torn = fh.tell() > 0 and fh.seek(-1, os.SEEK_END) >= 0 and fh.read(1) != b"\n"
+            fh.write((("\n" if torn else "") + rec + "\n").encode())
+        self._done.add(key)
+
+    def fetch(self, kind: str, params: dict, compute: Callable[[], Any]) -> Any:
+        """Return the cached cell, or compute, store and return it."""
+        key = self.key(kind, params)
+        if self.has(key):
+            return self.get(key)
+        value = compute()
+        self.put(key, value, kind, params)
+        return value
+
+
+def cached(cache: CellCache | None, kind: str, params: dict, compute: Callable[[], Any]) -> Any:
+    """`cache.fetch(...)`, or just `compute()` when caching is disabled."""
+    return compute() if cache is None else cache.fetch(kind, params, compute)
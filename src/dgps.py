@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Union, Iterable, overload
+from typing import Union, Iterable, Iterator, overload
 import numpy as np
 from scipy.special import erf  
 
@@ -89,6 +89,17 @@ class NormalTruth:
         z = rng.standard_normal(int(n))
         return self.mean + self.sd * z
 
+    def sample_chunks(self, n: int, chunk: int, seed: int | None = None) -> Iterator[np.ndarray]:
+        """Yield the same n draws as `sample(n, seed)` in blocks of ≤ chunk.
+
+        The generator is consumed sequentially, so concatenating the blocks
+        reproduces `sample` exactly while holding only one block in memory.
+        """
+        rng = np.random.default_rng(seed)
+        for lo in range(0, int(n), int(chunk)):
+            z = rng.standard_normal(min(int(chunk), int(n) - lo))
+            yield self.mean + self.sd * z
+
     def cdf_truth(self, t: ArrayLike) -> ArrayLike:
         """Evaluate the true CDF F(t) for the configured Normal.
 
@@ -136,6 +147,12 @@ class UniformTruth:
         rng = np.random.default_rng(seed)
         return rng.uniform(self.a, self.b, size=int(n))
 
+    def sample_chunks(self, n: int, chunk: int, seed: int | None = None) -> Iterator[np.ndarray]:
+        """Yield the same n draws as `sample(n, seed)` in blocks of ≤ chunk."""
+        rng = np.random.default_rng(seed)
+        for lo in range(0, int(n), int(chunk)):
+            yield rng.uniform(self.a, self.b, size=min(int(chunk), int(n) - lo))
+
     def cdf_truth(self, t: ArrayLike) -> ArrayLike:
         """Evaluate the true CDF on [a,b].
 
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import numpy as np
-from typing import Any
+from typing import Any, Sequence
 from .interfaces import PredictiveMethod, PredictiveState, Array
 from .dgps import NormalTruth, UniformTruth
 
@@ -26,13 +26,31 @@ class PolyaPredictive(PredictiveMethod):
     - State stores only the observed values (exchangeability ⇒ order irrelevant).
     - CDF evaluation is vectorized in `t` (supports scalar or array thresholds).
     - When n=0 (no data), the predictive reduces to the base CDF G0(t).
-    - Complexity per `cdf_est` call is O(n * |t|) due to pairwise comparisons.
+    - Default (list) state: each `cdf_est` call is O(n * |t|) due to pairwise
+      comparisons.
+    - `init_state(max_n=...)` returns an array-backed state instead: a
+      preallocated float64 buffer plus a sorted copy maintained by insertion,
+      so `cdf_est` is O(|t| log n) via `searchsorted` (update is an O(n)
+      memmove). Both states give bit-identical outputs.
+    - `alpha` may be an array: the counts are computed once and `cdf_est`
+      returns a (|α| × |t|) matrix (leading α axis everywhere).
+    - `init_batch` / `update_batch` / `cdf_est_batch` advance R replicate
+      streams in lockstep (2-D sorted buffer + per-replicate lengths) and
+      return (R × |t|) predictive matrices from one NumPy call.
+    - `prequential_cdf(xs)` returns the whole prequential PIT sequence
+      \tilde P_{i-1}(x_i) from rank counts in O(n log² n).
+    - `path(xs, t_grid, steps)` returns the whole prequential path
+      \tilde P_m(t), m = 0..n, in one vectorized call (cumulative counts), for
+      one stream or an (R × n) matrix of replicate streams.
     """
 
-    def __init__(self, alpha: float = 5.0, base: str = "normal"):
+    def __init__(self, alpha: float | Sequence[float] = 5.0, base: str = "normal"):
         # α > 0 ensures a proper DP prior; larger α ⇒ stronger pull to G0.
-        assert alpha > 0, "alpha must be positive"
-        self.alpha = float(alpha)
+        # An array of α values evaluates all of them from the same counts K_n(t):
+        # outputs then gain a leading α axis.
+        alpha_arr = np.asarray(alpha, dtype=float)
+        assert alpha_arr.ndim <= 1 and np.all(alpha_arr > 0), "alpha must be positive"
+        self.alpha = float(alpha_arr) if alpha_arr.ndim == 0 else alpha_arr
         # Choose the oracle base distribution used for G0(t).
         if base == "normal":
             self.base = NormalTruth()
@@ -41,19 +59,55 @@ class PolyaPredictive(PredictiveMethod):
         else:
             raise ValueError(f"Unknown base '{base}'. Use 'normal' or 'uniform'.")
 
+    def _mix(self, g0: Array, counts: Array, n: Array) -> Array:
+        # (α G0(t) + K_n(t)) / (α + n); with an α array the α axis leads.
+        a = self.alpha
+        if np.ndim(a):
+            a = a.reshape((-1,) + (1,) * np.ndim(np.add(g0, np.add(counts, n))))
+        return (a * g0 + counts) / (a + n)
+
     # ---- PredictiveMethod API ----
-    def init_state(self, **kwargs: Any) -> PredictiveState:
+    def init_state(self, max_n: int | None = None, **kwargs: Any) -> PredictiveState:
         # Minimal sufficient state for the DP predictive: the sample x_{1:n}.
-        # Stored as a list for cheap appends; converted to ndarray on demand.
-        return {"xs": []}
+        # Without `max_n`: a list for cheap appends, converted to ndarray on demand.
+        if max_n is None:
+            return {"xs": []}
+        # With `max_n`: arrival-order buffer + sorted copy, both preallocated
+        # (grown by doubling if the stream turns out longer than `max_n`).
+        cap = max(int(max_n), 1)
+        return {"buf": np.empty(cap, dtype=float), "sorted": np.empty(cap, dtype=float), "n": 0}
 
     def update(self, state: dict, x: float) -> dict:
         # Online update: append the new observation; maintains exchangeability.
-        state["xs"].append(float(x))
+        if "sorted" not in state:
+            state["xs"].append(float(x))
+            return state
+        x = float(x)
+        n = state["n"]
+        if n == state["buf"].size:
+            for key in ("buf", "sorted"):
+                grown = np.empty(2 * n, dtype=float)
+                grown[:n] = state[key]
+                state[key] = grown
+        state["buf"][n] = x
+        # Insert after any ties so the sorted copy stays stable.
+        srt = state["sorted"]
+        k = int(np.searchsorted(srt[:n], x, side="right"))
+        srt[k + 1:n + 1] = srt[k:n]
+        srt[k] = x
+        state["n"] = n + 1
         return state
 
     def cdf_est(self, state: dict, t: Array) -> Array:
         # Compute \tilde P_n((−∞, t]) for scalar or vector 't'.
+        if "sorted" in state:
+            n = state["n"]
+            t_arr = np.asarray(t, dtype=float)
+            # K_n(t) = #{x_i ≤ t} = right insertion point in the sorted sample.
+            counts = np.searchsorted(state["sorted"][:n], t_arr, side="right") if n else 0.0
+            g0 = self.base.cdf_truth(t_arr)
+            return self._mix(g0, counts, n)
+
         xs = np.asarray(state["xs"], dtype=float)
         n = xs.size
         t_arr = np.asarray(t, dtype=float)
@@ -72,10 +126,195 @@ class PolyaPredictive(PredictiveMethod):
         # Base CDF G0(t) from the chosen oracle truth.
         g0 = self.base.cdf_truth(t_arr)
         # Posterior predictive CDF: convex combination of G0 and empirical CDF.
-        return (self.alpha * g0 + counts) / (self.alpha + n)
+        return self._mix(g0, counts, n)
+
+    @staticmethod
+    def _prior_leq_counts(xs: np.ndarray) -> np.ndarray:
+        # c[i] = #{j < i : x_j ≤ x_i} for all i, by merge-sort levels: a pair
+        # (j, i) is counted once, at the level where j falls in the left half and
+        # i in the right half of the same block. Per level, left-half keys
+        # (block, rank) are sorted and the right-half queries are answered
+        # by searchsorted. The total cost is O(n log² n) in NumPy.
+        n = xs.size
+        _, r = np.unique(xs, return_inverse=True)    # dense ranks (ties share a rank)
+        r = r.astype(np.int64).ravel()
+        idx = np.arange(n)
+        c = np.zeros(n, dtype=np.int64)
+        h = 1
+        while h < n:
+            blk = idx // (2 * h)
+            left = (idx // h) % 2 == 0
+            keys = np.sort(blk[left] * (n + 1) + r[left])
+            q = ~left
+            base = blk[q] * (n + 1)
+            c[q] += (np.searchsorted(keys, base + r[q], side="right")
+                     - np.searchsorted(keys, base, side="left"))
+            h *= 2
+        return c
+
+    def prequential_cdf(self, xs: Array) -> np.ndarray:
+        r"""One-step-ahead predictive CDF at each new point: \tilde P_{i-1}(x_i).
+
+        Entry i (0-based) evaluates the predictive built from x_1..x_i at
+        x_{i+1}, i.e. the prequential PIT, for the whole stream at once in
+        O(n log² n) instead of O(n²) through repeated `cdf_est` calls. Entry 0
+        is G0(x_1). Values are bit-identical to `cdf_est`; with an α array the
+        shape is (|α|, n).
+        """
+        xs = np.asarray(xs, dtype=float).ravel()
+        counts = self._prior_leq_counts(xs)
+        return self._mix(self.base.cdf_truth(xs), counts, np.arange(xs.size))
+
+    def path(self, xs: Array, t_grid: Array, steps: Array | None = None,
+             m0: int = 0, k0: Array | None = None) -> np.ndarray:
+        r"""Whole prequential path \tilde P_m(t) for a stream, in one vectorized call.
+
+        Parameters
+        ----------
+        xs : array-like
+            Stream x_1, ..., x_n (in arrival order), or an (R, n) matrix of R
+            independent replicate streams evaluated together.
+        t_grid : array-like
+            Thresholds t (any order).
+        steps : array-like of int, optional
+            Sample sizes m ∈ {m0, ..., m0 + n} at which to record the predictive
+            (default: all of them). Restricting the steps bounds memory
+            at O(len(steps) * |t|).
+        m0, k0 : int, array-like, optional
+            Continue a stream in chunks: `xs` are observations m0+1..m0+n and
+            k0 = K_{m0}(t) are the counts of the earlier ones (default 0);
+            shape (|t|,), or (R, |t|) for replicate streams.
+
+        Returns
+        -------
+        np.ndarray
+            Shape (len(steps), |t|); row k is \tilde P_m(t) with m = steps[k],
+            bit-identical to `cdf_est` after m updates. Replicate streams add a
+            leading R axis, (R, len(steps), |t|), and an α array leads with
+            |α|, e.g. (|α|, R, len(steps), |t|).
+
+        Notes
+        -----
+        K_m(t) is a running count, so the path is a cumulative sum of indicator
+        rows: each x_i is binned against the sorted grid, counts are tallied per
+        (replicate, step block, bin) with one `bincount`, then cumulated over
+        blocks and bins.
+        """
+        xs = np.asarray(xs, dtype=float)
+        batch = xs.ndim == 2
+        X = xs if batch else xs.reshape(1, -1)
+        t_arr = np.asarray(t_grid, dtype=float).ravel()
+        (R, n), J = X.shape, t_arr.size
+        m0 = int(m0)
+        steps = np.arange(m0, m0 + n + 1) if steps is None else np.asarray(steps, dtype=np.int64).ravel()
+        if steps.size and (steps.min() < m0 or steps.max() > m0 + n):
+            raise ValueError(f"steps must lie in [{m0}, {m0 + n}]")
+        m, inv = np.unique(steps, return_inverse=True)
+
+        # Bin b_i = #{t < x_i} (sorted grid); x_i counts towards K(t_j) iff b_i ≤ j.
+        order = np.argsort(t_arr, kind="stable")
+        b = np.searchsorted(t_arr[order], X, side="left")
+        # Block k collects observations i (1-based) with m[k-1] < i ≤ m[k].
+        blk = np.searchsorted(m, np.arange(m0 + 1, m0 + n + 1), side="left")
+        keep = np.broadcast_to(blk < m.size, X.shape)
+        idx = (np.arange(R)[:, None] * m.size + blk[None, :]) * (J + 1) + b
+        tally = np.bincount(idx[keep], minlength=R * m.size * (J + 1))
+        K = tally.reshape(R, m.size, J + 1).cumsum(axis=1).cumsum(axis=2)[..., :J]
+
+        counts = np.empty_like(K)
+        counts[..., order] = K
+        if k0 is not None:
+            counts += np.asarray(k0, dtype=np.int64).reshape(-1, 1, J)
+        g0 = self.base.cdf_truth(t_arr)
+        P = self._mix(g0, counts, m[:, None])[..., inv, :]
+        return P if batch else P[..., 0, :, :]
 
     def pdf_est(self, state: dict, x: Array) -> Array:
         # DP predictive is a mixture with point masses at observed xs;
         # density is not well-defined as a smooth function → return NaNs.
         x_arr = np.asarray(x, dtype=float)
         return np.full_like(x_arr, np.nan, dtype=float) if getattr(x_arr, "ndim", 0) else np.nan
+
+
+class PolyaGridPredictive(PolyaPredictive):
+    r"""
+    Pólya predictive bound to a fixed evaluation grid t_1 < ... < t_J.
+
+    On the grid the predictive only needs the counts K_n(t_j), so the state
+    carries a binary indexed (Fenwick) tree over the J+1 grid bins
+    (−∞, t_1], (t_1, t_2], ..., (t_J, ∞): the tree update is O(log J) and
+    `cdf_grid` returns all J CDF values in O(J) without touching the raw
+    history. Off-grid queries (e.g. the PIT at a new x) fall back to the
+    parent implementation, so outputs are bit-identical to `PolyaPredictive`.
+
+    The raw history behind those off-grid queries is kept by default, and
+    maintaining it (the parent's sorted insertion) keeps `update` at O(n)
+    per observation. With `history=False` only the tree and n are stored:
+    `update` is O(log J) and off-grid queries raise.
+
+    Parameters
+    ----------
+    alpha, base
+        As in `PolyaPredictive`.
+    grid : array-like
+        Increasing evaluation grid (e.g. from `make_grid`).
+    history : bool
+        Keep the raw sample for off-grid queries (default True).
+    """
+
+    def __init__(self, alpha: float = 5.0, base: str = "normal", grid: Array | None = None,
+                 history: bool = True):
+        super().__init__(alpha=alpha, base=base)
+        self.history = bool(history)
+        if grid is None:
+            raise ValueError("PolyaGridPredictive needs an evaluation grid")
+        self.grid = np.asarray(grid, dtype=float)
+        if self.grid.ndim != 1 or np.any(np.diff(self.grid) <= 0):
+            raise ValueError("grid must be a strictly increasing 1-D array")
+        self._g0_grid = self.base.cdf_truth(self.grid)
+        # Fenwick prefix sums satisfy S(i) = tree[i] + S(i & (i-1)); i & (i-1)
+        # has one fewer set bit than i, so S is filled level by level (by popcount).
+        idx = np.arange(1, self.grid.size + 2)
+        pop = np.array([bin(i).count("1") for i in idx])
+        self._levels = [(idx[pop == b], idx[pop == b] & (idx[pop == b] - 1))
+                        for b in range(1, int(pop.max()) + 1)]
+
+    def init_state(self, max_n: int | None = None, **kwargs: Any) -> PredictiveState:
+        state = super().init_state(max_n=max_n, **kwargs) if self.history else {"n": 0}
+        state["tree"] = np.zeros(self.grid.size + 2, dtype=np.int64)  # 1-indexed, J+1 bins
+        return state
+
+    def update(self, state: dict, x: float) -> dict:
+        if self.history:
+            state = super().update(state, x)
+        else:
+            state["n"] += 1
+        # Bin b = #{t_j < x}; observation counts towards K_n(t_j) for all j ≥ b.
+        tree = state["tree"]
+        i = int(np.searchsorted(self.grid, float(x), side="left")) + 1
+        while i < tree.size:
+            tree[i] += 1
+            i += i & -i
+        return state
+
+    def grid_counts(self, state: dict) -> np.ndarray:
+        """K_n(t_j) for every grid point, in O(J) from the Fenwick tree."""
+        tree = state["tree"]
+        S = np.zeros_like(tree)
+        for i, parent in self._levels:
+            S[i] = tree[i] + S[parent]
+        return S[1:-1]
+
+    def cdf_grid(self, state: dict) -> np.ndarray:
+        """Predictive CDF at every grid point, O(J) and independent of n."""
+        n = state["n"] if "n" in state else len(state["xs"])
+        counts = self.grid_counts(state) if n else 0.0
+        return self._mix(self._g0_grid, counts, n)
+
+    def cdf_est(self, state: dict, t: Array) -> Array:
+        t_arr = np.asarray(t, dtype=float)
+        if t_arr.shape == self.grid.shape and (t is self.grid or np.array_equal(t_arr, self.grid)):
+            return self.cdf_grid(state)
+        if not self.history:
+            raise ValueError("off-grid queries need the raw history (history=True)")
+        return super().cdf_est(state, t)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import numpy as np
-from typing import Tuple
+from typing import Callable, Sequence, Tuple
 
 def d_infty(c_est: np.ndarray, c_true: np.ndarray) -> float:
     """Sup norm on the grid.
@@ -66,3 +66,242 @@ def make_grid(J: int, tmin: float, tmax: float) -> np.ndarray:
     The grid includes both endpoints (NumPy `linspace` default, inclusive).
     """
     return np.linspace(float(tmin), float(tmax), int(J))
+
+def record_steps(n: int, schedule: str | int | Sequence[int] = "all", start: int = 1,
+                 stop: int | None = None) -> np.ndarray:
+    """Steps i ∈ [start, n-1] at which stream diagnostics are recorded.
+
+    Parameters
+    ----------
+    n : int
+        Stream length (steps are 0..n-1; the final step n-1 is always included).
+    schedule : str | int | sequence of int
+        - "all": every step.
+        - "every:K" (or an int K): multiples of K.
+        - "log:K": geometric spacing with K points per decade (1, ..., 10, ...).
+        - "list:i1,i2,..." (or a sequence of ints): explicit steps.
+    start : int
+        First recordable step (default 1: nothing is predicted before data).
+    stop : int, optional
+        Only return steps < stop (a window of the schedule, e.g. one chunk of a
+        streamed run); "all"/"every" then cost O(window) instead of O(n).
+
+    Returns
+    -------
+    np.ndarray
+        Sorted unique int64 steps; empty if the window is empty.
+
+    Notes
+    -----
+    A log schedule records O(K log10 n) grid evaluations, e.g. a few hundred
+    for a 10⁶-step stream, instead of O(n).
+    """
+    last = int(n) - 1
+    hi = last + 1 if stop is None else min(int(stop), last + 1)
+    if hi <= start:
+        return np.empty(0, dtype=np.int64)
+    if isinstance(schedule, (int, np.integer)):
+        schedule = f"every:{int(schedule)}"
+    if isinstance(schedule, str):
+        kind, _, arg = schedule.partition(":")
+        if kind == "all":
+            steps = np.arange(start, hi)
+        elif kind == "every":
+            k = int(arg)
+            steps = np.arange(-(-start // k) * k, hi, k)
+        elif kind == "log":
+            k = float(arg)
+            e = np.arange(0, int(np.ceil(k * np.log10(max(last, 1)))) + 1) / k
+            steps = np.round(10.0 ** e).astype(np.int64)
+        elif kind == "list":
+            steps = np.array([int(s) for s in arg.split(",") if s.strip()], dtype=np.int64)
+        else:
+            raise ValueError(f"unknown schedule: {schedule!r}")
+    else:
+        steps = np.asarray(schedule, dtype=np.int64).ravel()
+    steps = np.append(steps, last)
+    return np.unique(steps[(steps >= start) & (steps < hi)])
+
+def d_infty_exact(x: np.ndarray, cdf: Callable[[np.ndarray], np.ndarray],
+                  alpha: float | np.ndarray = 0.0, presorted: bool = False) -> float | np.ndarray:
+    """Exact (grid-free) sup norm sup_t |P̃_n(t) − F(t)| of the DP predictive.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Observed sample x_1..x_n (shape (n,)).
+    cdf : callable
+        Continuous truth F, which must also be the base G0 of the predictive
+        (the exchangeable setup of Part B and `run_stream`).
+    alpha : float | np.ndarray
+        Concentration α ≥ 0; α = 0 gives the Kolmogorov–Smirnov distance of
+        the empirical CDF. An array of α values returns one distance per α.
+    presorted : bool
+        Skip the O(n log n) sort when `x` is already sorted.
+
+    Returns
+    -------
+    float | np.ndarray
+        The supremum over all real t (not just a grid).
+
+    Notes
+    -----
+    With G0 = F, P̃_n(t) − F(t) = (K_n(t) − n F(t)) / (α + n) is monotone
+    between data points, so the supremum is attained at the one-sided limits
+    at the order statistics u_(j) = F(x_(j)):
+        (α + n) · d = max_j max(j − n u_(j), n u_(j) − (j − 1)),
+    an O(n) pass over the sorted sample (0 when n = 0, since P̃_0 = G0 = F).
+    """
+    u = np.asarray(cdf(np.asarray(x, dtype=float).ravel() if presorted
+                       else np.sort(np.asarray(x, dtype=float).ravel())), dtype=float)
+    return _sup_from_sorted_u(u, alpha)
+
+def _sup_from_sorted_u(u: np.ndarray, alpha: float | np.ndarray) -> float | np.ndarray:
+    # (α + n) · sup = max_j max(j − n u_(j), n u_(j) − (j − 1)), j = 1..n.
+    n = u.size
+    if n == 0:
+        return np.zeros_like(alpha, dtype=float) if np.ndim(alpha) else 0.0
+    nu = n * u
+    j = np.arange(1, n + 1)
+    top = max(float(np.max(j - nu)), float(np.max(nu - (j - 1))), 0.0)
+    out = top / (np.asarray(alpha, dtype=float) + n)
+    return out if np.ndim(out) else float(out)
+
+class ExactSupNorm:
+    """Incremental exact sup norm of the DP predictive (see `d_infty_exact`).
+
+    Keeps the transformed sample u_i = F(x_i) sorted in a preallocated buffer
+    (grown by doubling): `update` finds the insertion point by bisection in
+    O(log n) (plus one contiguous shift), `extend` merges a block in
+    O(n + b log b), and `value` is an O(n) vectorized pass. The raw sample
+    is never re-sorted, so a stream evaluated at a few hundred recorded steps
+    costs O(n · #steps) instead of O(n log n · #steps).
+
+    Parameters
+    ----------
+    cdf : callable
+        Continuous truth F (= base G0 of the predictive).
+    alpha : float | array-like
+        Concentration(s) α ≥ 0; `value` returns one distance per α for arrays.
+    max_n : int, optional
+        Expected stream length (initial buffer size).
+    """
+
+    def __init__(self, cdf: Callable[[np.ndarray], np.ndarray],
+                 alpha: float | Sequence[float] = 0.0, max_n: int | None = None):
+        self.cdf = cdf
+        self.alpha = np.asarray(alpha, dtype=float) if np.ndim(alpha) else float(alpha)
+        self._u = np.empty(max(int(max_n or 16), 1), dtype=float)
+        self.n = 0
+
+    def _reserve(self, extra: int) -> None:
+        need = self.n + int(extra)
+        if need > self._u.size:
+            grown = np.empty(max(need, 2 * self._u.size), dtype=float)
+            grown[:self.n] = self._u[:self.n]
+            self._u = grown
+
+    def update(self, x: float) -> None:
+        """Insert one observation."""
+        u = float(self.cdf(np.asarray(float(x))))
+        self._reserve(1)
+        n, buf = self.n, self._u
+        k = int(np.searchsorted(buf[:n], u, side="right"))
+        buf[k + 1:n + 1] = buf[k:n]
+        buf[k] = u
+        self.n = n + 1
+
+    def extend(self, xs: np.ndarray) -> None:
+        """Insert a block of observations (one merge of sorted arrays)."""
+        v = np.sort(np.asarray(self.cdf(np.asarray(xs, dtype=float).ravel()), dtype=float))
+        if v.size == 0:
+            return
+        self._reserve(v.size)
+        n, buf = self.n, self._u
+        # Merge: new values land after old ties (stable), old values shift right.
+        pos_new = np.searchsorted(buf[:n], v, side="right") + np.arange(v.size)
+        pos_old = np.arange(n) + np.searchsorted(v, buf[:n], side="left")
+        buf[pos_old] = buf[:n].copy()
+        buf[pos_new] = v
+        self.n = n + v.size
+
+    def value(self) -> float | np.ndarray:
+        """Current exact sup_t |P̃_n(t) − F(t)|."""
+        return _sup_from_sorted_u(self._u[:self.n], self.alpha)
+
+class MetricEngine:
+    """Fused evaluation of several grid distances from one difference buffer.
+
+    Parameters
+    ----------
+    names : sequence of str
+        Metrics to compute, any of `MetricEngine.METRICS`:
+        - "d_infty": max_j |e_j| (as `d_infty`)
+        - "d_rmse":  sqrt(mean_j e_j²) (as `d_rmse`)
+        - "d_l1":    mean_j |e_j|
+        - "d_cvm":   Cramér–von Mises Σ_j e_j² w_j ≈ ∫ (P̃ − F)² dF
+        - "d_ad":    Anderson–Darling Σ_j e_j² w_j / (F_j (1 − F_j))
+        where e = c_est − c_true and w_j is the F-mass of grid cell j.
+    c_true : np.ndarray
+        True CDF on the grid (shape (J,)), fixed for the engine's lifetime.
+
+    Notes
+    -----
+    `compute` subtracts into a preallocated buffer and derives |e| and e²
+    once in place, so adding metrics costs one reduction each and repeated
+    calls (one per recorded step) allocate no (… × J) temporaries. Inputs may
+    be (J,) or batched (R, J) (e.g. replicates or steps); buffers are kept per
+    batch shape. "d_infty" and "d_rmse" are bit-identical to the standalone
+    functions, row by row.
+    """
+
+    METRICS = ("d_infty", "d_rmse", "d_l1", "d_cvm", "d_ad")
+
+    def __init__(self, names: Sequence[str] = ("d_infty", "d_rmse"), c_true: np.ndarray | None = None):
+        unknown = [m for m in names if m not in self.METRICS]
+        if unknown:
+            raise ValueError(f"unknown metrics {unknown}; choose from {self.METRICS}")
+        if c_true is None:
+            raise ValueError("c_true (true CDF on the grid) is required")
+        self.names = tuple(names)
+        self.c_true = np.asarray(c_true, dtype=float).ravel()
+        # Cell masses of F around each grid point (midpoint rule) for CvM/AD.
+        edges = np.concatenate([self.c_true[:1], (self.c_true[1:] + self.c_true[:-1]) / 2, self.c_true[-1:]])
+        w = np.diff(edges)
+        fq = self.c_true * (1.0 - self.c_true)
+        self._w = {"d_cvm": w,
+                   "d_ad": np.divide(w, fq, out=np.zeros_like(w), where=fq > 0)}
+        self._bufs: dict[tuple, tuple[np.ndarray, ...]] = {}
+
+    def _buffers(self, shape: tuple) -> tuple[np.ndarray, ...]:
+        if shape not in self._bufs:
+            self._bufs[shape] = (np.empty(shape), np.empty(shape), np.empty(shape))
+        return self._bufs[shape]
+
+    def compute(self, c_est: np.ndarray) -> dict[str, float | np.ndarray]:
+        """All selected metrics for c_est of shape (J,) or (R, J).
+
+        Returns
+        -------
+        dict
+            name → float for a (J,) input, name → (R,) array for (R, J).
+        """
+        c_est = np.asarray(c_est, dtype=float)
+        diff, sq, tmp = self._buffers(c_est.shape)
+        np.subtract(c_est, self.c_true, out=diff)
+        np.square(diff, out=sq)
+        np.abs(diff, out=diff)                       # diff now holds |e|
+        J = self.c_true.size
+        out = {}
+        for m in self.names:
+            if m == "d_infty":
+                v = np.max(diff, axis=-1)
+            elif m == "d_rmse":
+                v = np.sqrt(np.mean(sq, axis=-1))
+            elif m == "d_l1":
+                v = np.add.reduce(diff, axis=-1) / J
+            else:
+                # Row-wise reductions (not BLAS matvec) keep batched == per-row.
+                v = np.add.reduce(np.multiply(sq, self._w[m], out=tmp), axis=-1)
+            out[m] = float(v) if c_est.ndim == 1 else v
+        return out
@@ -0,0 +1,205 @@
+# src/prop26.py
+from __future__ import annotations
+
+import math
+from typing import Sequence
+import numpy as np
+import pandas as pd
+
+from .polya import PolyaCellSampler, PolyaSequenceModel
+
+# Columns of the Prop 2.6 raw CSV (one row per (rep, n, t)), shared by both engines.
+PROP26_COLUMNS = ["rep", "n", "alpha", "base", "t", "Pn", "Vnt", "level", "z", "L",
+                  "Fhat", "lo", "hi", "covered", "width"]
+
+# Upper bound on the (reps × n × |t|) indicator tensor held at once.
+_MAX_CELLS = 4_000_000
+
+
+def tail_sd(P: np.ndarray | float, L: int) -> np.ndarray | float:
+    r"""Predicted error (SD) of the L-step tail average F̂(t) as an estimate of \tilde F(t).
+
+    Given the directing measure the tail draws are iid, so the tail average
+    has conditional variance \tilde F(t)(1 − \tilde F(t)) / L; \tilde F(t) is
+    replaced by the urn's martingale P_{n+L}(t), its current best estimate.
+    For the rb target pass L = α + n + L + 1: Var(\tilde F(t) | x_{1:n+L})
+    = P_{n+L}(t)(1 − P_{n+L}(t)) / (α + n + L + 1).
+    """
+    return np.sqrt(P * (1.0 - P) / L)
+
+
+def coverage_se(covered: np.ndarray) -> float:
+    """Binomial SE of a coverage estimate, Agresti–Coull adjusted.
+
+    The (x+2)/(M+4) adjustment keeps the SE away from 0 when a small batch
+    happens to be all-covered (or all-missed), so adaptive runs cannot stop
+    on a spurious zero.
+    """
+    M = covered.size
+    p = (covered.sum() + 2.0) / (M + 4.0)
+    return math.sqrt(p * (1.0 - p) / M)
+
+
+def width_se(width: np.ndarray) -> float:
+    """Monte Carlo SE of the mean interval width."""
+    return float(np.std(width, ddof=1) / math.sqrt(width.size)) if width.size > 1 else math.inf
+
+
+def prop26_block(n: int, M: int, tvals: Sequence[float], alpha: float, base: str,
+                 target: str, L: int, level: float, z: float, seed: int,
+                 batch: int | None = None, tail_tol: float | None = None,
+                 tail_block: int = 1000) -> pd.DataFrame:
+    r"""All M replicates of the Prop 2.6 study at one n, vectorized over replicates.
+
+    Parameters
+    ----------
+    n : int
+        Prefix length.
+    M : int
+        Number of Monte Carlo replicates.
+    tvals : sequence of float
+        Thresholds t.
+    alpha, base : float, {"uniform","normal"}
+        DP concentration and base G0.
+    target : {"continuation","exact","rb"}
+        F̂(t) from L further draws of the same urn, the L → ∞ limit \tilde F(t),
+        or the Rao–Blackwellized P_{n+L}(t) of the same L draws.
+    L : int
+        Tail length for the continuation and rb targets.
+    level, z : float
+        Nominal level and its normal critical value.
+    seed : int
+        Base seed; the block is seeded from (seed, n) only.
+    batch : int, optional
+        Index of a further batch of replicates at the same n (adaptive runs):
+        seeded from (seed, n, batch), independent of every other batch.
+    tail_tol, tail_block : float, int, optional
+        Adaptive continuation length (see `prop26_nested`).
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns `PROP26_COLUMNS`, rows ordered by (rep, t) as in the loop engine
+        (reps numbered from 0 within the block).
+
+    Notes
+    -----
+    Only the indicators 1{x ≤ t} enter the study, so the urn is projected on
+    the cells cut by the thresholds. By de Finetti, that cell sequence is iid
+    given cell masses p ~ Dirichlet(α G0(cells)), which are also the limit
+    masses: \tilde F(t) is the cumulative p, and the continuation tail is
+    Multinomial(L, p) (together, the Dirichlet-multinomial law of L further
+    urn draws). The prefix is one (M × n) uniform matrix; K_m(t), P_m(t) and
+    V_{n,t} = (1/n) Σ_m m² (P_m − P_{m−1})² are cumulative sums over the
+    (M × n × |t|) indicator tensor, processed in blocks of replicates.
+    """
+    return prop26_nested([n], M, tvals, alpha, base, target, L, level, z, seed, batch=batch,
+                         tail_tol=tail_tol, tail_block=tail_block)
+
+
+def prop26_nested(ns: Sequence[int], M: int, tvals: Sequence[float], alpha: float, base: str,
+                  target: str, L: int, level: float, z: float, seed: int,
+                  batch: int | None = None, tail_tol: float | None = None,
+                  tail_block: int = 1000) -> pd.DataFrame:
+    r"""Nested-n Prop 2.6 study: one urn per replicate, read at every checkpoint n.
+
+    Each replicate grows a single prefix to max(ns); P_n, V_{n,t}, the CI and
+    its coverage are emitted at every n in `ns` from the same running sums,
+    against one shared target per replicate (the continuation of the full
+    prefix, or the limit \tilde F). Parameters as in `prop26_block`, which is
+    the single-checkpoint case (seeded from (seed, max(ns))), plus:
+
+    Parameters
+    ----------
+    tail_tol : float, optional
+        Adaptive continuation: extend each replicate's tail in blocks of
+        `tail_block` draws and stop once `tail_sd` ≤ tail_tol × CI width for
+        every t (narrowest CI over the checkpoints), or at L draws.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns `PROP26_COLUMNS` (+ `L_used` with `tail_tol`), rows ordered by
+        (n, rep, t); `rep` identifies the urn, so rows of one rep at different
+        n share the same path.
+    """
+    ns = sorted({int(v) for v in ns})
+    n = ns[-1]
+    key = seed + 104729 * n
+    rng = np.random.default_rng(key if batch is None else [key, int(batch)])
+    M = int(M)
+    t_arr = np.asarray(tvals, dtype=float)
+    T = t_arr.size
+    cells = PolyaCellSampler(alpha=alpha, base=base, ts=t_arr)
+    g0 = PolyaSequenceModel(alpha=alpha, base=base).G0(t_arr)
+
+    # Directing cell masses per replicate; cum[:, s] = \tilde F(t_(s)) (sorted t).
+    g = rng.standard_gamma(np.broadcast_to(alpha * cells.g0_cells, (M, cells.n_cells)))
+    p = g / g.sum(axis=1, keepdims=True)
+    cum = np.cumsum(p, axis=1)[:, :-1]
+    orig = np.argsort(cells._order)              # sorted column of each original t
+
+    at = np.asarray(ns) - 1                      # checkpoint rows of the running sums
+    Pn = np.empty((M, len(ns), T))
+    Vnt = np.empty((M, len(ns), T))
+    Kn = np.empty((M, T), dtype=np.int64)       # K_n(t) at the largest n
+    m = np.arange(1, n + 1)[:, None]             # (n, 1)
+    rows = max(1, _MAX_CELLS // max(n * T, 1))
+    for r0 in range(0, M, rows):
+        c = cum[r0:r0 + rows][:, orig]          # (B, T) in the original t order
+        # x_m ≤ t  ⇔  u_m < \tilde F(t): indicator tensor (B, n, T), then K_m(t).
+        u = rng.random((c.shape[0], n))
+        K = np.cumsum(u[:, :, None] < c[:, None, :], axis=1)
+        P = (alpha * g0 + K) / (alpha + m)       # P_m(t), m = 1..n
+        dP = np.diff(P, axis=1, prepend=np.broadcast_to(g0, (c.shape[0], 1, T)))
+        S = np.cumsum(m ** 2 * dP ** 2, axis=1)  # Σ_{j ≤ m} j² (P_j − P_{j−1})²
+        Vnt[r0:r0 + rows] = S[:, at] / (at + 1)[:, None]
+        Pn[r0:r0 + rows] = P[:, at]
+        Kn[r0:r0 + rows] = K[:, -1]
+
+    nn = np.asarray(ns, dtype=float)[None, :, None]
+    se = np.sqrt(np.maximum(Vnt, 1e-12) / nn)
+    lo, hi = Pn - z * se, Pn + z * se
+
+    L_used = None
+    if target == "exact":
+        Fhat = cum[:, orig]
+        L_col = math.inf
+    else:
+        if tail_tol is None:
+            tail = rng.multinomial(int(L), p)    # cell counts of the L-step tail
+            Lu = np.full(M, float(L))
+        else:
+            # Adaptive tail: all running replicates share the current length.
+            tol = tail_tol * (2 * z * se).min(axis=1)   # (M, T)
+            tail = np.zeros((M, cells.n_cells), dtype=np.int64)
+            L_used = np.zeros(M, dtype=np.int64)
+            run = np.arange(M)
+            length = 0
+            while run.size and length < L:
+                step = min(int(tail_block), int(L) - length)
+                tail[run] += rng.multinomial(step, p[run])
+                length += step
+                L_used[run] = length
+                leq = np.cumsum(tail[run], axis=1)[:, :-1][:, orig]
+                P_tail = (alpha * g0 + Kn[run] + leq) / (alpha + n + length)
+                eff = length if target == "continuation" else alpha + n + length + 1
+                run = run[~np.all(tail_sd(P_tail, eff) <= tol[run], axis=1)]
+            Lu = L_used.astype(float)
+        leq = np.cumsum(tail, axis=1)[:, :-1][:, orig]
+        if target == "continuation":
+            Fhat = leq / Lu[:, None]
+        else:                                    # "rb": P_{n+L}(t) = E[\tilde F(t) | x_{1:n+L}]
+            Fhat = (alpha * g0 + Kn + leq) / (alpha + n + Lu[:, None])
+        L_col = L
+    Fhat = np.broadcast_to(Fhat[:, None, :], Pn.shape)
+    # (M, |ns|, T) → rows ordered by (n, rep, t)
+    flat = lambda a: np.ascontiguousarray(np.broadcast_to(a, Pn.shape).transpose(1, 0, 2)).ravel()
+    return pd.DataFrame({
+        "rep": flat(np.arange(M)[:, None, None]), "n": flat(np.asarray(ns)[None, :, None]),
+        "alpha": alpha, "base": base, "t": flat(t_arr), "Pn": flat(Pn), "Vnt": flat(Vnt),
+        "level": level, "z": z, "L": L_col, "Fhat": flat(Fhat), "lo": flat(lo), "hi": flat(hi),
+        "covered": flat(((lo <= Fhat) & (Fhat <= hi)).astype(int)),
+        "width": flat(2 * z * se),
+        **({} if L_used is None else {"L_used": flat(L_used[:, None, None])}),
+    }, columns=PROP26_COLUMNS + ([] if L_used is None else ["L_used"]))
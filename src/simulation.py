@@ -3,14 +3,16 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
+from typing import Sequence
 import numpy as np
 import pandas as pd
 
 from .dgps import NormalTruth, UniformTruth
-from .metrics import d_infty, d_rmse, make_grid
+from .metrics import ExactSupNorm, MetricEngine, make_grid, record_steps
+from .storage import append_dataset
 
 
-def _build_method(method_name: str, n: int, **params):
+def _build_method(method_name: str, n: int, grid: np.ndarray | None = None, **params):
     """Factory for predictive methods used in the stream simulation.
 
     Parameters
@@ -19,6 +21,9 @@ def _build_method(method_name: str, n: int, **params):
         Identifier of the predictive method (currently only "polya_dp").
     n : int
         Sample size (forwarded to methods that might need it).
+    grid : np.ndarray, optional
+        Fixed evaluation grid. When given, "polya_dp" is bound to it
+        (`PolyaGridPredictive`) so grid evaluations cost O(J) regardless of n.
     **params
         Additional keyword args forwarded to the method constructor.
 
@@ -28,13 +33,15 @@ def _build_method(method_name: str, n: int, **params):
         Instantiated method object and a short method label for output.
     """
     if method_name == "polya_dp":
-        from .methods import PolyaPredictive
+        from .methods import PolyaGridPredictive, PolyaPredictive
+        if grid is not None:
+            return PolyaGridPredictive(grid=grid, **params), "polya_dp"
         return PolyaPredictive(**params), "polya_dp"
     else:
         raise ValueError(f"Unknown method: {method_name}")
 
 
-def run_stream(
+def simulate_stream(
     method_name: str,
     n: int,
     J: int,
@@ -42,11 +49,14 @@ def run_stream(
     tmax: float,
     record_every: int,
     seed: int,
-    out_path: str,
+    vectorized: bool = True,
+    schedule: str | int | list[int] | None = None,
+    exact: bool = False,
+    distances: Sequence[str] = ("d_infty", "d_rmse"),
     **params,
-) -> str:
+) -> pd.DataFrame:
     """
-    Simulate an online predictive-evaluation stream and save results.
+    Simulate an online predictive-evaluation stream and return its log.
 
     Workflow
     --------
@@ -56,7 +66,8 @@ def run_stream(
          - BEFORE seeing X_i, evaluate the method's one-step predictive CDF.
          - Record the PIT at X_i and distance metrics on a fixed grid (thinned).
          - Update the method with X_i.
-    3) Save a row per i to a parquet file.
+       (Methods with a vectorized form do this for all i at once.)
+    3) Return a row per i (see `run_stream` to save it).
 
     Parameters
     ----------
@@ -72,18 +83,34 @@ def run_stream(
         Thinning interval for recording distances (smaller → more frequent).
     seed : int
         RNG seed for reproducibility of the data stream.
-    out_path : str
-        Destination parquet path.
+    schedule : str | int | list[int], optional
+        Recording schedule overriding `record_every` ("all", "every:K",
+        "log:K" points per decade, "list:..." or explicit steps); see
+        `metrics.record_steps`. The final step is always recorded.
+    exact : bool
+        Also record the exact (grid-free) sup norm sup_t |P̃_i(t) − F(t)| in a
+        `d_sup` column, at the same steps (`metrics.ExactSupNorm`; the
+        method's base is the truth here). Opt-in: O(i) per recorded step.
+    distances : sequence of str
+        Grid distances to record, one column each, computed together by a
+        `metrics.MetricEngine` ("d_infty", "d_rmse", "d_l1", "d_cvm", "d_ad");
+        "d_sup" in the list is the same as `exact=True`.
+    vectorized : bool
+        If True (default) and the method provides `prequential_cdf` and
+        `path`, evaluate the whole stream at once in
+        O(n log² n + #recorded steps · J); otherwise (or if False) run the
+        per-step loop over `cdf_est`/`update`. Both give identical output.
     **params
         Extra parameters passed to the method constructor
-        (e.g., alpha=..., base="uniform"/"normal").
+        (e.g., alpha=..., base="uniform"/"normal"). A sequence of α values is
+        logged from a single data pass, with an extra `alpha` column.
 
     Returns
     -------
-    str
-        The `out_path` that was written.
+    pd.DataFrame
+        Columns i, method, [alpha], x_i, pit, <distances> (default d_infty,
+        d_rmse), [d_sup], seed, n.
     """
-    rng = np.random.default_rng(seed)
 
     # Pick the truth to match the method's base (exchangeable setup).
     # This ensures G0 in the method aligns with the DGP for clean comparisons.
@@ -100,47 +127,132 @@ def run_stream(
     t_grid = make_grid(J, tmin, tmax)
     c_true_grid = truth.cdf_truth(t_grid)
 
-    # Build method (e.g., Pólya DP) and initialize its internal state
-    method, mname = _build_method(method_name, n, **params)
-    try:
-        state = method.init_state(max_n=n)  # some methods may accept this kwarg
-    except TypeError:
-        state = method.init_state()
-
-    recs = []
-    for i in range(n):
-        x_i = x[i]
-
-        # Evaluate BEFORE observing x_i (one-step predictive, proper online eval)
-        if i == 0:
-            # No predictive available before any data; mark as NaN
-            pit_i = np.nan
-            d_inf_i = np.nan
-            d_rmse_i = np.nan
-        else:
-            # PIT at the realized x_i using the current state (pre-update)
-            pit_i = float(method.cdf_est(state, x_i))
-
-            # Distances on grid, thinned by `record_every` and at the final step
-            if (i % record_every) == 0 or i == n - 1:
-                c_est_grid = np.asarray(method.cdf_est(state, t_grid), dtype=float)
-                d_inf_i = d_infty(c_est_grid, c_true_grid)
-                d_rmse_i = d_rmse(c_est_grid, c_true_grid)
-            else:
-                d_inf_i = np.nan
-                d_rmse_i = np.nan
-
-        # Append a record for this time step
-        recs.append((i, mname, x_i, pit_i, d_inf_i, d_rmse_i, seed, n))
-
-        # Online update with the new observation
-        state = method.update(state, float(x_i))
-
-    # Materialize the log as a tidy DataFrame
-    df = pd.DataFrame(
-        recs,
-        columns=["i", "method", "x_i", "pit", "d_infty", "d_rmse", "seed", "n"],
-    )
+    # Build method (e.g., Pólya DP)
+    method, mname = _build_method(method_name, n, grid=t_grid, **params)
+
+    # An α sequence is evaluated from the same counts in one pass; every
+    # per-step quantity then carries a leading α axis (A = number of α values).
+    alphas = params.get("alpha")
+    multi = np.ndim(alphas) == 1
+    A = len(alphas) if multi else 1
+
+    # Steps with recorded distances (always including the final step):
+    # multiples of `record_every` unless an explicit `schedule` is given.
+    rec_steps = record_steps(n, record_every if schedule is None else schedule).tolist()
+
+    # Grid distances come from one fused engine; "d_sup" is the exact tracker.
+    names = list(distances) + (["d_sup"] if exact and "d_sup" not in distances else [])
+    engine = MetricEngine([m for m in names if m != "d_sup"], c_true_grid)
+    exact = "d_sup" in names
+
+    # No predictive is available before any data (i = 0), and distances are
+    # only recorded at `rec_steps`: those entries stay NaN.
+    pit = np.full((A, n), np.nan)
+    dist = {m: np.full((A, n), np.nan) for m in names}
+    sup = ExactSupNorm(truth.cdf_truth, alpha=method.alpha, max_n=n) if exact else None
+
+    if vectorized and hasattr(method, "prequential_cdf") and hasattr(method, "path"):
+        # Whole stream at once: PIT from prequential ranks (O(n log² n)) and the
+        # grid predictive only at the recorded steps (O(len(rec_steps) · J)).
+        pit[:, 1:] = method.prequential_cdf(x).reshape(A, n)[:, 1:]
+        if rec_steps:   # none for n ≤ 1 (no predictive before the first datum)
+            P = method.path(x, t_grid, steps=rec_steps).reshape(A * len(rec_steps), -1)
+            for m, v in engine.compute(P).items():
+                dist[m][:, rec_steps] = v.reshape(A, -1)
+        if sup is not None:
+            # Exact sup norm: merge the data between recorded steps into the tracker.
+            for i in rec_steps:
+                sup.extend(x[sup.n:i])
+                dist["d_sup"][:, i] = sup.value()
+    else:
+        # Per-step fallback for methods without a vectorized form.
+        rec_set = set(rec_steps)
+        try:
+            state = method.init_state(max_n=n)  # some methods may accept this kwarg
+        except TypeError:
+            state = method.init_state()
+
+        for i in range(n):
+            x_i = x[i]
+
+            # Evaluate BEFORE observing x_i (one-step predictive, proper online eval)
+            if i > 0:
+                # PIT at the realized x_i using the current state (pre-update)
+                pit[:, i] = method.cdf_est(state, x_i)
+
+                # Distances on grid, at the scheduled steps only
+                if i in rec_set:
+                    c_est_grid = np.asarray(method.cdf_est(state, t_grid), dtype=float)
+                    for m, v in engine.compute(c_est_grid.reshape(A, -1)).items():
+                        dist[m][:, i] = v
+                    if sup is not None:
+                        dist["d_sup"][:, i] = sup.value()
+
+            # Online update with the new observation
+            state = method.update(state, float(x_i))
+            if sup is not None:
+                sup.update(x_i)
+
+    # Materialize the log as a tidy DataFrame (one block of n rows per α)
+    frames = []
+    for a in range(A):
+        cols = {"i": np.arange(n), "method": mname}
+        if multi:
+            cols["alpha"] = float(alphas[a])
+        cols.update({"x_i": x, "pit": pit[a]})
+        cols.update({m: dist[m][a] for m in names})
+        cols.update({"seed": seed, "n": n})
+        frames.append(pd.DataFrame(cols))
+    return pd.concat(frames, ignore_index=True)
+
+
+def run_stream(
+    method_name: str,
+    n: int,
+    J: int,
+    tmin: float,
+    tmax: float,
+    record_every: int,
+    seed: int,
+    out_path: str,
+    vectorized: bool = True,
+    sink: str = "file",
+    schedule: str | int | list[int] | None = None,
+    exact: bool = False,
+    distances: Sequence[str] = ("d_infty", "d_rmse"),
+    **params,
+) -> str:
+    """
+    Simulate an online predictive-evaluation stream and save results.
+
+    Parameters
+    ----------
+    method_name, n, J, tmin, tmax, record_every, seed, vectorized, schedule, exact, distances, **params
+        As in `simulate_stream`.
+    out_path : str
+        Destination: a parquet file (sink="file") or the root of a
+        Hive-partitioned dataset (sink="dataset").
+    sink : {"file","dataset"}
+        "file" writes one parquet file per stream; "dataset" appends the rows
+        to a single dataset partitioned by method/n (`src.storage.append_dataset`).
+
+    Returns
+    -------
+    str
+        The `out_path` that was written.
+    """
+    df = simulate_stream(method_name, n, J, tmin, tmax, record_every, seed,
+                         vectorized=vectorized, schedule=schedule, exact=exact, distances=distances,
+                         **params)
+    return write_stream(df, out_path, sink=sink)
+
+
+def write_stream(df: pd.DataFrame, out_path: str, sink: str = "file") -> str:
+    """Save a stream log to a parquet file or append it to a dataset (see `run_stream`)."""
+    if sink == "dataset":
+        return append_dataset(df, out_path)
+    if sink != "file":
+        raise ValueError(f"unknown sink: {sink}")
 
     # Ensure output directory exists, then write parquet (fastparquet engine)
     Path(os.path.dirname(out_path)).mkdir(parents=True, exist_ok=True)
@@ -0,0 +1,92 @@
+# src/storage.py
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Sequence
+import pandas as pd
+import fastparquet
+
+# Default layout of the stream dataset: <root>/method=<m>/n=<n>/part.<k>.parquet
+PARTITION_ON = ("method", "n")
+
+
+def append_dataset(
+    df: pd.DataFrame,
+    root: str,
+    partition_on: Sequence[str] = PARTITION_ON,
+    row_group_size: int = 1_000_000,
+) -> str:
+    """Append rows to a single Hive-partitioned Parquet dataset.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Rows to append (e.g. one or more `run_stream` logs with a `rep` column).
+    root : str
+        Dataset directory; created on first write, appended to afterwards.
+    partition_on : sequence of str
+        Partition columns (directory levels), default ("method", "n").
+    row_group_size : int
+        Maximum rows per row group; large groups keep per-file overhead low.
+
+    Returns
+    -------
+    str
+        The dataset `root`.
+
+    Notes
+    -----
+    - `method` is stored as a categorical, so it is dictionary-encoded when it
+      is not used as a partition column.
+    - Every call adds one file per touched partition: batch many cells per
+      call (the sweep runner buffers worker results and appends from the
+      parent process, so there is a single writer).
+    """
+    df = df.copy()
+    if "method" in df.columns:
+        df["method"] = df["method"].astype("category")
+    exists = os.path.exists(os.path.join(root, "_metadata"))
+    Path(root).mkdir(parents=True, exist_ok=True)
+    fastparquet.write(
+        root, df,
+        partition_on=list(partition_on),
+        file_scheme="hive",
+        row_group_offsets=int(row_group_size),
+        append=exists,
+    )
+    return root
+
+
+def read_dataset(
+    root: str,
+    columns: Sequence[str] | None = None,
+    filters: list | None = None,
+) -> pd.DataFrame:
+    """Load (a subset of) a dataset written by `append_dataset`.
+
+    Parameters
+    ----------
+    root : str
+        Dataset directory.
+    columns : sequence of str, optional
+        Columns to read (default: all); partition columns may be included.
+    filters : list, optional
+        Partition/row-group filters in fastparquet form, e.g.
+        [("method", "==", "polya_dp"), ("n", "in", [100, 500])]. Only the
+        matching partitions are opened.
+
+    Returns
+    -------
+    pd.DataFrame
+        Selected rows/columns; `method` stays categorical, numeric partition
+        columns (e.g. `n`) are cast back to their integer type.
+    """
+    pf = fastparquet.ParquetFile(root)
+    df = pf.to_pandas(columns=list(columns) if columns is not None else None, filters=filters)
+    for col in pf.cats:
+        if col in df.columns and col != "method":
+            cats = df[col].cat.categories
+            if pd.api.types.is_numeric_dtype(cats):
+                df[col] = df[col].astype(cats.dtype)
+    return df.reset_index(drop=True)
@@ -2,11 +2,14 @@ import argparse
 from pathlib import Path
 import os, pandas as pd
 
+from src.prop26 import coverage_se, width_se
+
 def main():
     """Summarize raw simulation outputs into compact CSVs for reporting.
 
     Two summaries:
-    1) Proposition 2.6 (coverage and interval width) aggregated by (n, t).
+    1) Proposition 2.6 (coverage and interval width, with their Monte Carlo
+       SEs and the number of replicates) aggregated by (n, t).
     2) Part B quick diagnostics for distance metrics (d_infty, d_rmse).
 
     Inputs
@@ -19,7 +22,10 @@ def main():
     Notes
     -----
     - The script is idempotent: if a raw file is missing, it prints [skip].
-    - Grouped aggregation uses mean for coverage/width and nunique for reps.
+    - Grouped aggregation uses mean for coverage/width and nunique for reps;
+      coverage_se is the Agresti–Coull binomial SE sqrt(p(1-p)/reps) with
+      p = (covered + 2)/(reps + 4), and width_se = SD(width)/sqrt(reps): the
+      same estimators as the adaptive stopping rule (`src.prop26`).
     """
     ap = argparse.ArgumentParser(description="Summarize raw outputs into tidy CSVs.")
     ap.add_argument("--raw", default="results/raw", help="raw results dir")
@@ -28,6 +34,9 @@ def main():
     ap.add_argument("--seed", type=int, default=2025)
     ap.add_argument("--base", choices=["uniform","normal"], default="uniform")
     ap.add_argument("--stem", default="partB_n1000_a5.0_seed2025_uniform")
+    ap.add_argument("--prop26", default=None,
+                    help="Prop 2.6 raw CSV to summarize (default: the make-all M=400 file; "
+                         "e.g. an _adaptive or _nested run)")
     args = ap.parse_args()
 
     raw = Path(args.raw); raw.mkdir(parents=True, exist_ok=True)
@@ -36,15 +45,24 @@ def main():
     # ---- Prop 2.6 summary (coverage/width by n,t)
     # Expected input schema (columns):
     #   n, t, covered (0/1), width (float), rep (replicate id), ...
-    prop26 = raw / f"prop26_M400_L50000_a{args.alpha}_seed{args.seed}_{args.base}.csv"
+    # Default input is the `make all` run; --prop26 selects another raw CSV.
+    prop26 = (Path(args.prop26) if args.prop26 else
+              raw / f"prop26_M400_L50000_a{args.alpha}_seed{args.seed}_{args.base}.csv")
     if prop26.exists():
         df = pd.read_csv(prop26)
-        # Aggregate by (n, t): mean coverage and mean interval width; count reps.
+        # Aggregate by (n, t): mean coverage and mean interval width; count reps
+        # (the achieved M per cell for adaptive runs) and the Monte Carlo SEs.
         summ = (df.groupby(["n","t"])
                   .agg(coverage=("covered","mean"),
                        mean_width=("width","mean"),
-                       reps=("rep","nunique"))
+                       reps=("rep","nunique"),
+                       width_se=("width", lambda w: width_se(w.to_numpy())))
                   .reset_index())
+        # SEs as in the adaptive stopping rule (coverage: Agresti–Coull adjusted).
+        summ.insert(5, "coverage_se", df.groupby(["n","t"])["covered"]
+                                        .agg(lambda c: coverage_se(c.to_numpy())).to_numpy())
+        if "L_used" in df.columns:   # adaptive continuation (--tail-tol)
+            summ["mean_L_used"] = df.groupby(["n","t"])["L_used"].mean().to_numpy()
         summ.to_csv(out / "prop26_summary.csv", index=False)
         print(f"[ok] wrote {out/'prop26_summary.csv'}")
     else:
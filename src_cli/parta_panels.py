@@ -1,12 +1,82 @@
 from __future__ import annotations
 from pathlib import Path
-import argparse, numpy as np
+import argparse, math, numpy as np
 import matplotlib.pyplot as plt
 from src.plotstyle import apply_plot_style
+from src.cache import CellCache, code_version
 from scipy.stats import beta
-from src.polya import PolyaSequenceModel, build_prefix, continue_urn_once
+from src.polya import (PolyaSequenceModel, PolyaBatchSampler, PolyaCellSampler, UrnTable, build_prefix,
+                       continue_table, continue_urn_once, continued_mass_pmf, sample_limit)
 
-def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, base: str, seed: int):
+def _horizon(s: str) -> int | float:
+    """Parse --M: a positive integer length, or "inf" for the exact limit."""
+    return math.inf if s.lower() in {"inf", "infinity"} else int(s)
+
+def continued_masses(x_obs: list[float], ts: list[float], model: PolyaSequenceModel,
+                     M: int, N: int, engine: str = "cells") -> np.ndarray:
+    """Empirical masses at every t for N continuations of the same prefix.
+
+    Parameters
+    ----------
+    x_obs : list[float]
+        Observed prefix x_{1:n} (shared by all continuations).
+    ts : list[float]
+        Thresholds t.
+    model : PolyaSequenceModel
+        Urn model (α, base, RNG) used for the continuations.
+    M : int | float
+        Final length of each continued trajectory; math.inf draws the exact
+        limit P̃((−∞, t]) from its Beta/Dirichlet posterior (`sample_limit`).
+    N : int
+        Number of continuations.
+    engine : {"cells","batch","table","loop"}
+        "cells" (default) only draws the counts in the cells cut by `ts`
+        (`PolyaCellSampler`): one Dirichlet-multinomial draw per continuation,
+        O(#thresholds) work independent of M and no real-valued draws;
+        "batch" draws all N full trajectories with `PolyaBatchSampler`;
+        "table" continues the compact atom/count state (`continue_table`),
+        using memory proportional to the number of atoms instead of M;
+        "loop" uses the per-step reference `continue_urn_once`.
+
+    Returns
+    -------
+    np.ndarray
+        Shape (N, len(ts)); entry [r, i] is the fraction of trajectory r ≤ ts[i].
+
+    Raises
+    ------
+    ValueError
+        If M is shorter than the prefix, or the engine is unknown.
+    """
+    if M < len(x_obs):
+        raise ValueError(f"continuation length M={M} is shorter than the prefix (n={len(x_obs)})")
+    if math.isinf(M):
+        return sample_limit(x_obs, ts, model, size=N)
+    if engine == "batch":
+        sampler = PolyaBatchSampler(alpha=model.alpha, base=model.base, rng=model.rng)
+        traj = sampler.sample(N, M, prefix=x_obs)
+        return np.stack([np.mean(traj <= t, axis=1) for t in ts], axis=1)
+    elif engine == "cells":
+        cells = PolyaCellSampler(alpha=model.alpha, base=model.base, ts=ts, rng=model.rng)
+        counts = cells.sample(N, M - len(x_obs), counts=cells.counts_of(x_obs))
+        return cells.K(counts) / M
+    elif engine == "table":
+        table = UrnTable.from_sequence(x_obs)
+        post = np.empty((N, len(ts)), dtype=float)
+        for r in range(N):
+            post[r] = continue_table(table, model, M - len(x_obs)).count_leq(ts) / M
+        return post
+    elif engine == "loop":
+        post = np.empty((N, len(ts)), dtype=float)
+        for r in range(N):
+            traj = np.asarray(continue_urn_once(x_obs, model, M))
+            post[r] = [np.mean(traj <= t) for t in ts]
+        return post
+    raise ValueError(f"unknown engine: {engine}")
+
+
+def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, base: str, seed: int,
+                engine: str = "cells", analytic: bool = False, cache_dir: str | None = None):
     """Render a grid of panels showing distributions of P((−∞, t]) via Pólya continuation.
 
     Parameters
@@ -17,14 +87,23 @@ def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, ba
         Row-wise thresholds t at which we evaluate probability mass.
     alphas : list[float]
         Column-wise concentration parameters α of the Pólya/DP prior.
-    M : int
-        Continuation length per trajectory (final length of each simulated path).
+    M : int | float
+        Continuation length per trajectory (final length of each simulated path);
+        math.inf draws the M → ∞ limit exactly instead of continuing the urn.
     N : int
         Number of Monte Carlo continuations per cell (panel).
     base : {"uniform","normal"}
         Base distribution G0 for the urn (U(0,1) or N(0,1)).
     seed : int
         RNG seed for reproducibility.
+    engine : {"cells","batch","table","loop"}
+        Continuation engine (default "cells"; see `continued_masses`).
+    analytic : bool
+        If True, skip the Monte Carlo continuations and draw the exact law of
+        the continued mass instead of a histogram: the Beta-binomial PMF of
+        (K_n + Y)/M (`continued_mass_pmf`), or the Beta density when M = inf.
+    cache_dir : str, optional
+        Resumable cache of finished (n, α) panel cells (`src.cache.CellCache`).
     """
     rng = np.random.default_rng(seed)
     # Initialize model with first α (will be reassigned inside the loop).
@@ -32,6 +111,25 @@ def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, ba
     # Observed prefix x_{1:n} used for all panels (same dataset across the grid).
     x_obs = build_prefix(n, model)
 
+    # Continuations do not depend on t: simulate once per α and read off every t.
+    # With a cache, each α cell is stored with the RNG state after it, so a
+    # resumed run continues the same random stream (bit-identical panels).
+    cache = CellCache(cache_dir, code=code_version([__file__])) if cache_dir else None
+    posts = []
+    if not analytic:
+        for j, a in enumerate(alphas):
+            model.alpha = a
+            params = {"n": n, "ts": ts, "alphas": alphas[:j + 1], "M": M, "N": N,
+                      "base": base, "seed": seed, "engine": engine}
+            key = cache.key("parta_cell", params) if cache else None
+            if cache and cache.has(key):
+                post, rng.bit_generator.state = cache.get(key)
+            else:
+                post = continued_masses(x_obs, ts, model, M, N, engine=engine)
+                if cache:
+                    cache.put(key, (post, rng.bit_generator.state), "parta_cell", params)
+            posts.append(post)
+
     # Figure layout: rows correspond to thresholds t, columns correspond to α.
     R, C = len(ts), len(alphas)
     fig, axes = plt.subplots(R, C, figsize=(12, 8), sharex=True, sharey=False)
@@ -42,22 +140,25 @@ def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, ba
         k_n = sum(1 for x in x_obs if x <= t)
 
         for j, a in enumerate(alphas):
-            # Update α for this column (reuse same model/RNG).
-            model.alpha = a
-            # Monte Carlo: continue the *same* prefix N times up to length M,
-            # record the empirical mass at t for each continuation.
-            post = np.empty(N, dtype=float)
-            for r in range(N):
-                traj = continue_urn_once(x_obs, model, M)
-                post[r] = np.mean(np.asarray(traj) <= t)
-
             ax = axes[i, j]
             x = np.linspace(0, 1, 600)
             # Conjugate Beta overlay parameters for indicators 1{x ≤ t}.
-            a_post, b_post = a*t + k_n, a*(1 - t) + (n - k_n)
-
-            # Histogram (posterior/prior draws of mass at t) + Beta overlay + reference line t.
-            ax.hist(post, bins=50, density=True, alpha=0.8, edgecolor="none")
+            g0 = float(model.G0(t))
+            a_post, b_post = a*g0 + k_n, a*(1 - g0) + (n - k_n)
+
+            if not analytic:
+                # Monte Carlo: N continuations of the *same* prefix up to length M,
+                # empirical mass at t for each continuation.
+                ax.hist(posts[j][:, i], bins=50, density=True, alpha=0.8, edgecolor="none")
+            elif math.isinf(M):
+                ax.fill_between(x, beta.pdf(x, a_post, b_post), alpha=0.8, lw=0)
+            else:
+                # Exact PMF on the grid k/M, drawn as a density (bar width 1/M).
+                support, pmf = continued_mass_pmf(k_n, n, M, a, g0)
+                edges = np.append(support, support[-1] + 1.0 / M) - 0.5 / M
+                ax.stairs(pmf * M, edges, fill=True, alpha=0.8)
+
+            # Beta overlay + reference line t.
             ax.plot(x, beta.pdf(x, a_post, b_post), lw=1.0, color="tab:orange")
             ax.axvline(t, ls="--", lw=1.0, color="tab:blue")
 
@@ -82,14 +183,19 @@ def panel_for_n(n: int, ts: list[float], alphas: list[float], M: int, N: int, ba
     # Figure title and configuration subtitle.
     title = rf"{label} draws of $\tilde P((-\infty, t])$ under Pólya sequence"
     fig.suptitle(title, fontsize=13, fontweight="regular", x=0.6, y=0.94)
-    subtitle = f"Base: {base}  |  n = {n},  α ∈ {alphas}  |  M = {M}, N = {N}"
+    mc = "exact law" if analytic else f"N = {N}"
+    subtitle = f"Base: {base}  |  n = {n},  α ∈ {alphas}  |  M = {M}, {mc}"
     fig.text(0.6, 0.9, subtitle, ha="center", va="top", fontsize=10, style='italic')
 
     # Layout: reserve margins for row/column headers and the two-line header.
     fig.tight_layout(rect=[0.08, 0.08, 1.0, 0.90])
 
     # Save PNG + PDF variants; mirror existing naming convention.
-    out = f"results/figures/post_panels_cont_n{n}_M{M}_N{N}_{base}.png"
+    if analytic:
+        out = f"results/figures/post_panels_exact_n{n}_M{M}_{base}.png"
+    else:
+        out = f"results/figures/post_panels_cont_n{n}_M{M}_N{N}_{base}.png"
+    Path(out).parent.mkdir(parents=True, exist_ok=True)
     fig.savefig(out, dpi=140)
     fig.savefig(Path(out).with_suffix('.pdf'))
     plt.close(fig)
@@ -103,14 +209,24 @@ def main():
     ap.add_argument("--t", dest="ts", type=float, nargs="+", default=[0.25,0.5,0.75])
     ap.add_argument("--alpha", dest="alphas", type=float, nargs="+", default=[1,5,20])
     ap.add_argument("--n", type=int, default=150)
-    ap.add_argument("--M", type=int, default=1000)
+    ap.add_argument("--M", type=_horizon, default=1000,
+                    help="continuation length, or 'inf' to draw the exact limit")
     ap.add_argument("--N", type=int, default=2000)
     ap.add_argument("--seed", type=int, default=20250101)
+    ap.add_argument("--engine", choices=["cells","batch","table","loop"], default="cells",
+                    help="continuation engine: threshold-cell counts only (Dirichlet-multinomial), "
+                         "vectorized full-trajectory sampler, compact atom/count table "
+                         "(memory O(#atoms)), or per-step reference loop")
+    ap.add_argument("--analytic", action="store_true",
+                    help="render the exact Beta-binomial law of the continued mass (no Monte Carlo)")
+    ap.add_argument("--cache-dir", default=None,
+                    help="resumable cache of finished (n, α) continuation cells")
     args = ap.parse_args()
     apply_plot_style()  # apply global rcParams for consistent styling
 
     # Run the panel generator with parsed CLI arguments.
-    panel_for_n(args.n, args.ts, args.alphas, args.M, args.N, args.base, args.seed)
+    panel_for_n(args.n, args.ts, args.alphas, args.M, args.N, args.base, args.seed,
+                engine=args.engine, analytic=args.analytic, cache_dir=args.cache_dir)
 
 if __name__ == "__main__":
     main()
@@ -5,6 +5,10 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from src.plotstyle import apply_plot_style
 
+# Legend labels of the distances logged by partb_log_convergence.
+_LABELS = {"d_infty": r"$d^{(\infty)}$", "d_rmse": "RMSE", "d_l1": r"$L^1$",
+           "d_cvm": "Cramér–von Mises", "d_ad": "Anderson–Darling", "d_sup": r"exact $\sup_t$"}
+
 def _read_csv(p: Path):
     """Read a CSV if it exists; otherwise return None (silent skip helper)."""
     return pd.read_csv(p) if p.exists() else None
@@ -20,6 +24,9 @@ def main():
 
     Expected raw files (searched under results/raw/):
       - distances_{stem}.csv           → convergence distances over i
+      - bands_{stem}.csv               → replicate bands (from --reps R > 1);
+                                         when present, the convergence figure
+                                         shows the mean with the quantile band
       - Pm_paths_{stem}.csv            → predictive paths (preferred)
       - predictive_path_{stem}.csv     → fallback name for predictive paths
 
@@ -43,24 +50,38 @@ def main():
 
     # Candidate input files
     path_dist = raw / f"distances_{args.stem}.csv"
+    path_band = raw / f"bands_{args.stem}.csv"
     path_pm   = raw / f"Pm_paths_{args.stem}.csv"
     path_alt  = raw / f"predictive_path_{args.stem}.csv"  # fallback
 
     # Load data if present
     dfD = _read_csv(path_dist)
+    dfB = _read_csv(path_band)
     dfP = _read_csv(path_pm)
     if dfP is None:
         dfP = _read_csv(path_alt)
 
     # --- Figure 1: convergence (distances vs i) ---
-    if dfD is not None:
-        # Basic schema validation
-        need = {"i","d_infty","d_rmse"}
-        if not need.issubset(dfD.columns):
-            raise ValueError(f"Distances CSV missing {need}; got {set(dfD.columns)}.")
+    if dfB is not None:
+        # Replicate bands: mean curve + central quantile band per logged metric
+        dists = [c[:-5] for c in dfB.columns if c.endswith("_mean")]
+        need = {"i"} | {f"{d}_{s}" for d in dists for s in ("lo","hi")}
+        if not dists or not need.issubset(dfB.columns):
+            raise ValueError(f"Bands CSV missing {need}; got {set(dfB.columns)}.")
+        plt.figure(figsize=(6.5, 4.0))
+        for d in dists:
+            line, = plt.plot(dfB["i"], dfB[f"{d}_mean"], label=f"{_LABELS.get(d, d)} (mean)")
+            plt.fill_between(dfB["i"], dfB[f"{d}_lo"], dfB[f"{d}_hi"],
+                             color=line.get_color(), alpha=0.25, lw=0)
+    elif dfD is not None:
+        # Basic schema validation: step column + at least one distance
+        dists = [c for c in dfD.columns if c != "i"]
+        if "i" not in dfD.columns or not dists:
+            raise ValueError(f"Distances CSV needs 'i' and distance columns; got {set(dfD.columns)}.")
         plt.figure(figsize=(6.5, 4.0))
-        plt.plot(dfD["i"], dfD["d_infty"], label=r"$d^{(\infty)}$")
-        plt.plot(dfD["i"], dfD["d_rmse"],  label="RMSE")
+        for d in dists:
+            plt.plot(dfD["i"], dfD[d], label=_LABELS.get(d, d))
+    if dfB is not None or dfD is not None:
         plt.xlabel("Step $i$ (number of observations)"); plt.ylabel("Distance between $\\tilde P_i$ and $\\tilde F$")
         plt.title(f"Convergence of Predictive CDF $\\tilde F$ — {args.title}" if args.title else "Convergence")
         plt.legend(frameon=False)
@@ -6,7 +6,18 @@ import pandas as pd
 
 from src.methods import PolyaPredictive
 from src.dgps import UniformTruth, NormalTruth
-from src.metrics import make_grid, d_infty, d_rmse
+from src.metrics import ExactSupNorm, MetricEngine, make_grid, record_steps
+
+def _leq_counts(X: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Row-wise counts #{x ∈ X[r] : x ≤ t_j} for an (R, n) matrix, shape (R, |t|)."""
+    order = np.argsort(t, kind="stable")
+    J = t.size
+    b = np.searchsorted(t[order], X, side="left")          # x ≤ t_j  ⇔  b ≤ j
+    tally = np.bincount((np.arange(X.shape[0])[:, None] * (J + 1) + b).ravel(),
+                        minlength=X.shape[0] * (J + 1))
+    out = np.empty((X.shape[0], J), dtype=np.int64)
+    out[:, order] = tally.reshape(-1, J + 1).cumsum(axis=1)[:, :J]
+    return out
 
 def main():
     """Log convergence metrics and predictive paths for Part B (no PIT).
@@ -16,12 +27,27 @@ def main():
       2) Runs an online predictive method (Pólya DP) and, BEFORE each update:
          - evaluates the estimated CDF on a grid to compute d_∞ and RMSE
          - records P_m(t) for each requested threshold t
-      3) Writes two tidy CSVs under results/raw/:
-         - distances_{stem}.csv with columns [i, d_infty, d_rmse]
+      3) Writes two tidy CSVs under results/raw/ (one pair per α when several
+         α values are given; they share the data pass and the counts K_m(t)):
+         - distances_{stem}.csv with columns [i, d_infty, d_rmse] (or the
+           metrics chosen with --distances, e.g. d_l1 d_cvm d_ad)
          - Pm_paths_{stem}.csv with columns [m, t, Pm]
+      4) With --reps R > 1, simulates R streams (seeds seed, ..., seed+R-1) as
+         an (R × n) matrix, evaluates the grid predictive of all replicates
+         together at each recorded step, and also writes
+         - bands_{stem}.csv with columns [i, <d>_{mean,lo,med,hi} for each
+           distance d] (mean, central --band quantiles, median);
+         the distances/Pm_paths CSVs keep logging replicate 0.
+      5) With --exact, adds a d_sup column to distances_{stem}.csv: the exact
+         sup over all t of |P̃_i(t) − F(t)| (`src.metrics.ExactSupNorm`), which
+         the J-point d_infty can only underestimate.
 
     Notes
     -----
+    - The stream is generated and processed in chunks of --chunk observations
+      (same data as a one-shot draw); only the counts K_m(t) are carried over
+      and rows are appended to the CSVs after every chunk, so memory is bounded
+      and partial output is usable mid-run.
     - Evaluation is prequential (one-step-ahead): metrics at time i use data up
       to i−1 only. The first step (i=0) has no metrics recorded.
     - Grid endpoints default to [0,1] for Uniform and [-4,4] for Normal;
@@ -32,13 +58,29 @@ def main():
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     ap.add_argument("--n", type=int, required=True)
-    ap.add_argument("--alpha", type=float, required=True)
+    ap.add_argument("--alpha", type=float, nargs="+", required=True,
+                    help="one or more concentrations α (all logged from one data pass)")
     ap.add_argument("--t", type=float, nargs="+", required=True, help="one or more thresholds t")
     ap.add_argument("--seed", type=int, default=2025)
     ap.add_argument("--base", choices=["uniform","normal"], default="uniform")
     ap.add_argument("--J", type=int, default=100)
     ap.add_argument("--tmin", type=float, default=0.0)
     ap.add_argument("--tmax", type=float, default=1.0)
+    ap.add_argument("--chunk", type=int, default=100_000,
+                    help="observations (over all replicates) generated/processed per chunk; bounds memory")
+    ap.add_argument("--reps", type=int, default=1,
+                    help="replicate streams R (seeds seed..seed+R-1) evaluated in lockstep; "
+                         "R > 1 also writes bands_{stem}.csv")
+    ap.add_argument("--band", type=float, default=0.9,
+                    help="central quantile band level over replicates (with --reps > 1)")
+    ap.add_argument("--distances", nargs="+", default=["d_infty", "d_rmse"],
+                    choices=list(MetricEngine.METRICS),
+                    help="grid distances to log (computed together by src.metrics.MetricEngine)")
+    ap.add_argument("--exact", action="store_true",
+                    help="also log the exact (grid-free) sup norm d_sup (O(i) per recorded step)")
+    ap.add_argument("--record", default="all",
+                    help="recording schedule: all, every:K, log:K (K points per decade) or "
+                         "list:i1,i2,...; the final step is always recorded")
     args = ap.parse_args()
 
     # Truth and evaluation range
@@ -50,48 +92,100 @@ def main():
         truth = NormalTruth(0.0, 1.0)
         tmin, tmax = -4.0, 4.0
 
-    # Data stream (fixed by seed for reproducibility).
-    x = truth.sample(n=args.n, seed=args.seed)
-
-    # Predictive model (Pólya/DP) and its internal state.
-    pred = PolyaPredictive(alpha=args.alpha, base=args.base)
-    state = pred.init_state()
-
     # Grid for distance metrics.
     # For Normal base, allow user overrides via --tmin/--tmax; else use defaults above.
     grid = make_grid(args.J, args.tmin if args.base == "normal" else tmin,
                             args.tmax if args.base == "normal" else tmax)
     c_true_grid = truth.cdf_truth(grid)
+    ts = np.asarray(args.t, dtype=float)
 
-    rec_dist = []  # rows: (i, d_infty, d_rmse)   — convergence diagnostics
-    rec_Pm   = []  # rows: (m, t, Pm)             — predictive path trajectories
-
-    for i in range(args.n):
-        xi = float(x[i])
-
-        # Evaluate BEFORE update (prequential).
-        if i > 0:
-            c_est = np.asarray(pred.cdf_est(state, grid), dtype=float)
-            rec_dist.append((i, float(d_infty(c_est, c_true_grid)),
-                                float(d_rmse (c_est, c_true_grid))))
-            for t in args.t:
-                pm_t = float(pred.cdf_est(state, float(t)))
-                rec_Pm.append((i, float(t), pm_t))
-
-        # Bayesian update with the new observation.
-        state = pred.update(state, xi)
+    # Predictive model (Pólya/DP) for all α at once (counts K_m(t) are shared).
+    pred = PolyaPredictive(alpha=args.alpha, base=args.base)
 
-    # Write CSVs to results/raw with a descriptive stem.
+    # One CSV pair per α (plus a bands CSV with --reps > 1), created with
+    # headers up front; rows are appended chunk by chunk, so partial output is
+    # readable while the run is going.
+    R = int(args.reps)
+    q_lo, q_hi = (1.0 - args.band) / 2.0, (1.0 + args.band) / 2.0
+    # Grid distances of every replicate and step come from one fused engine.
+    engine = MetricEngine(args.distances, c_true_grid)
+    band_cols = ["i"] + [f"{d}_{s}" for d in engine.names for s in ("mean", "lo", "med", "hi")]
+    dist_cols = ["i", *engine.names] + (["d_sup"] if args.exact else [])
     outdir = Path("results/raw"); outdir.mkdir(parents=True, exist_ok=True)
-    stem = f"partB_n{args.n}_a{args.alpha}_seed{args.seed}_{args.base}"
-
-    pd.DataFrame(rec_dist, columns=["i","d_infty","d_rmse"])\
-      .to_csv(outdir / f"distances_{stem}.csv", index=False)
-    pd.DataFrame(rec_Pm,   columns=["m","t","Pm"])\
-      .to_csv(outdir / f"Pm_paths_{stem}.csv",   index=False)
-
-    print(f"[ok] wrote {outdir / ('distances_' + stem + '.csv')}")
-    print(f"[ok] wrote {outdir / ('Pm_paths_'   + stem + '.csv')}")
+    outputs = []
+    for alpha in args.alpha:
+        stem = f"partB_n{args.n}_a{alpha}_seed{args.seed}_{args.base}"
+        f_dist, f_pm = outdir / f"distances_{stem}.csv", outdir / f"Pm_paths_{stem}.csv"
+        f_band = outdir / f"bands_{stem}.csv" if R > 1 else None
+        pd.DataFrame(columns=dist_cols).to_csv(f_dist, index=False)
+        pd.DataFrame(columns=["m","t","Pm"]).to_csv(f_pm, index=False)
+        if f_band is not None:
+            pd.DataFrame(columns=band_cols).to_csv(f_band, index=False)
+        else:
+            (outdir / f"bands_{stem}.csv").unlink(missing_ok=True)  # stale bands of an older run
+        outputs.append((f_dist, f_pm, f_band))
+
+    # Stream the data (fixed by seed for reproducibility) in chunks; the only
+    # state carried between chunks is the counts K_m(t) on the grid and at t.
+    # Replicate r is the stream of seed + r (r = 0 is the single logged stream);
+    # the R streams form an (R × chunk) matrix evaluated in lockstep, and a
+    # chunk holds --chunk observations in total across replicates.
+    cols = max(1, args.chunk // R)
+    streams = [truth.sample_chunks(n=args.n, chunk=cols, seed=args.seed + r) for r in range(R)]
+    k_grid = np.zeros((R, grid.size), dtype=np.int64)
+    k_t = np.zeros((R, ts.size), dtype=np.int64)
+    # Exact (grid-free) sup norm of replicate 0, fed up to each recorded step.
+    sup = ExactSupNorm(truth.cdf_truth, alpha=pred.alpha, max_n=args.n) if args.exact else None
+    m0 = 0
+    for block in zip(*streams):
+        X = np.stack(block)                                                  # (R, chunk)
+        # Evaluate BEFORE update (prequential): step i uses x_{1:i}, i = 1..n-1,
+        # at the steps of the recording schedule that fall in this chunk.
+        steps = record_steps(args.n, args.record, start=max(1, m0), stop=m0 + X.shape[1])
+        if steps.size:
+            c_est_all = pred.path(X, grid, steps=steps, m0=m0, k0=k_grid)   # (|α|, R, #steps, J)
+            pm_all = pred.path(X[0], ts, steps=steps, m0=m0, k0=k_t[0])     # (|α|, #steps, |t|)
+            if sup is not None:
+                exact = np.empty((len(args.alpha), steps.size))             # (|α|, #steps)
+                for k, i in enumerate(steps):
+                    sup.extend(X[0, sup.n - m0:i - m0])
+                    exact[:, k] = sup.value()
+            for a, ((f_dist, f_pm, f_band), c_est, pm) in enumerate(zip(outputs, c_est_all, pm_all)):
+                vals = {d: v.reshape(R, steps.size)                         # (R, #steps) each
+                        for d, v in engine.compute(c_est.reshape(-1, grid.size)).items()}
+                # rows: (i, <distances>[, d_sup]) — convergence diagnostics (replicate 0)
+                rec_dist = {"i": steps, **{d: v[0] for d, v in vals.items()}}
+                if sup is not None:
+                    rec_dist["d_sup"] = exact[a]
+                # rows: (m, t, Pm)             — predictive path trajectories
+                rec_Pm = pd.DataFrame({"m": np.repeat(steps, ts.size),
+                                       "t": np.tile(ts, steps.size),
+                                       "Pm": pm.ravel()})
+                pd.DataFrame(rec_dist, columns=dist_cols)\
+                  .to_csv(f_dist, mode="a", header=False, index=False)
+                rec_Pm.to_csv(f_pm, mode="a", header=False, index=False)
+                if f_band is not None:
+                    # rows: (i, mean/lo/med/hi of each distance over replicates)
+                    rec_band = {"i": steps}
+                    for d, v in vals.items():
+                        lo, med, hi = np.quantile(v, [q_lo, 0.5, q_hi], axis=0)
+                        rec_band.update({f"{d}_mean": v.mean(axis=0), f"{d}_lo": lo,
+                                         f"{d}_med": med, f"{d}_hi": hi})
+                    pd.DataFrame(rec_band, columns=band_cols)\
+                      .to_csv(f_band, mode="a", header=False, index=False)
+
+        # Bayesian update with the whole chunk: K_m(t) += #{x ≤ t}, per replicate.
+        if sup is not None:
+            sup.extend(X[0, sup.n - m0:])
+        k_grid += _leq_counts(X, grid)
+        k_t += _leq_counts(X, ts)
+        m0 += X.shape[1]
+
+    for f_dist, f_pm, f_band in outputs:
+        print(f"[ok] wrote {f_dist}")
+        print(f"[ok] wrote {f_pm}")
+        if f_band is not None:
+            print(f"[ok] wrote {f_band}")
 
 if __name__ == "__main__":
     main()
@@ -3,6 +3,10 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 
+from src.cache import CellCache, cached, code_version
+from src.polya import PolyaSequenceModel, UrnTable, continue_table, sample_limit
+from src.prop26 import coverage_se, prop26_block, prop26_nested, tail_sd, width_se
+
 # ---- base CDF and base sampler ----
 def G0_cdf(t, base="uniform"):
     """Base CDF G0(t) for the chosen prior base.
@@ -53,6 +57,123 @@ def draw_polya_next(xs, alpha, rng, base="uniform"):
         j = rng.integers(0, m)        # pick an existing atom uniformly
         return float(xs[j])
 
+def simulate_rep(n, rep, tvals, alpha, base, target, L, level, z, seed,
+                 tail_tol=None, tail_block=1000):
+    """One (n, rep) block of the Prop 2.6 study: prefix, CI and target F̂(t).
+
+    Returns one row (dict) per threshold t; the RNG is seeded from
+    (seed, rep, n) only, so blocks are independent and can be cached.
+    """
+    return simulate_rep_nested([n], rep, tvals, alpha, base, target, L, level, z, seed,
+                               tail_tol=tail_tol, tail_block=tail_block)
+
+def simulate_rep_nested(nvals, rep, tvals, alpha, base, target, L, level, z, seed,
+                        tail_tol=None, tail_block=1000):
+    """One replicate urn read at every checkpoint n in `nvals` (nested-n mode).
+
+    The prefix is grown once to max(nvals); P_n, V_{n,t}, the CI and its
+    coverage are recorded at each checkpoint against one shared target per
+    replicate (continuation of the full prefix, or the exact limit). Rows are
+    ordered by (n, t); the RNG is seeded from (seed, rep, max(nvals)), so a
+    single checkpoint reproduces `simulate_rep`.
+
+    With `tail_tol`, the continuation is extended in blocks of `tail_block`
+    draws and stops once `src.prop26.tail_sd` ≤ tail_tol × CI width at every
+    t (narrowest CI over the checkpoints), or at L draws; rows then carry
+    the tail length used as `L_used`.
+    """
+    rows = []
+    nvals = sorted(set(int(v) for v in nvals))
+    n_max = nvals[-1]
+    checkpoints = set(nvals)
+    # Independent per-(rep,n) seed to avoid path reuse across settings.
+    rng = np.random.default_rng(seed + 7919*rep + 104729*n_max)
+
+    # --- generate prefix x1..xn from the Pólya urn
+    xs = []
+    # Book-keeping for each t: K_m(t), previous P_{m-1}, running sum for V_{n,t}
+    Km = {t: 0 for t in tvals}
+    P_prev = {t: G0_cdf(t, base) for t in tvals}  # P0(t) = G0(t)
+    Vnt = {t: 0.0 for t in tvals}
+    snap = {}                                      # n -> (P_n, V_{n,t}) per t
+
+    for m in range(1, n_max+1):
+        # draw x_m using the same urn
+        x_m = draw_polya_next(xs, alpha, rng, base=base)
+        xs.append(x_m)
+
+        # update counts and P_m, accumulate m^2 (P_m - P_{m-1})^2
+        for t in tvals:
+            if x_m <= t:
+                Km[t] += 1
+            Pm = (alpha*G0_cdf(t, base) + Km[t]) / (alpha + m)
+            Vnt[t] += (m**2) * (Pm - P_prev[t])**2
+            P_prev[t] = Pm     # becomes P_m for next step
+
+        if m in checkpoints:
+            # P_m(t) for each t and the finalized V_{m,t}
+            snap[m] = ({t: (alpha*G0_cdf(t, base) + Km[t]) / (alpha + m) for t in tvals},
+                       {t: Vnt[t] / m for t in tvals})
+
+    model = PolyaSequenceModel(alpha=alpha, base=base, rng=rng)
+    if target == "exact":
+        # --- exact limit: F~(t) | x_{1:n} drawn jointly over t in O(1)
+        Fhat = dict(zip(tvals, map(float, sample_limit(xs, tvals, model))))
+    else:
+        # --- continuation: extend the SAME urn by L steps and estimate F~(t)
+        # Work on the (atom, count) table so memory is O(#atoms), not O(n+L).
+        table = UrnTable.from_sequence(xs)
+
+        def tail_leq(cont):
+            tail = cont.counts.copy()
+            tail[:table.atoms.size] -= table.counts  # draws made during the tail
+            return {t: int(tail[cont.atoms <= t].sum()) for t in tvals}
+
+        if tail_tol is None:
+            L_used = L
+            leq = tail_leq(continue_table(table, model, L))
+        else:
+            # Adaptive length: blocks continue the same urn, stopping once the
+            # predicted error of F̂ is small vs the CI.
+            width = {t: min(2*z*math.sqrt(max(snap[n][1][t], 1e-12) / n) for n in nvals)
+                     for t in tvals}
+            cont, L_used = table, 0
+            while L_used < L:
+                step = min(int(tail_block), L - L_used)
+                cont = continue_table(cont, model, step)
+                L_used += step
+                leq = tail_leq(cont)
+                P = {t: (alpha*G0_cdf(t, base) + Km[t] + leq[t]) / (alpha + n_max + L_used)
+                     for t in tvals}
+                eff = L_used if target == "continuation" else alpha + n_max + L_used + 1
+                if all(tail_sd(P[t], eff) <= tail_tol * width[t] for t in tvals):
+                    break
+        if target == "rb":
+            # Rao–Blackwell: P_{n+L}(t) = E[F~(t) | x_{1:n+L}] from the same draws.
+            Fhat = {t: (alpha*G0_cdf(t, base) + Km[t] + leq[t]) / (alpha + n_max + L_used)
+                    for t in tvals}
+        else:
+            Fhat = {t: leq[t] / float(L_used) for t in tvals}
+
+    # rows: record CI, coverage, width, and supporting quantities
+    for n in nvals:
+        Pn, Vn = snap[n]
+        for t in tvals:
+            se = math.sqrt(max(Vn[t], 1e-12) / n)
+            lo = Pn[t] - z*se
+            hi = Pn[t] + z*se
+            covered = int(lo <= Fhat[t] <= hi)
+            rows.append({
+                "rep": rep, "n": n, "alpha": alpha, "base": base, "t": t,
+                "Pn": Pn[t], "Vnt": Vn[t], "level": level, "z": z,
+                "L": math.inf if target == "exact" else L, "Fhat": Fhat[t], "lo": lo, "hi": hi,
+                "covered": covered, "width": 2*z*se
+            })
+            if tail_tol is not None:
+                rows[-1]["L_used"] = L_used
+
+    return rows
+
 def main():
     """Compute Proposition 2.6 predictive CIs for \tilde F(t) via continuation.
 
@@ -64,14 +185,44 @@ def main():
          V_{n,t} = (1/n) * Σ_{m=1}^n m^2 (P_m − P_{m−1})^2.
       3) Compute P_n(t) at the end of the prefix.
       4) CONTINUE THE SAME URN by L extra draws to estimate \tilde F(t) as
-         F̂(t) = (1/L) * Σ 1{x_{n+ℓ} ≤ t}.
+         F̂(t) = (1/L) * Σ 1{x_{n+ℓ} ≤ t}  (--target continuation), or by the
+         predictive P_{n+L}(t) of the same draws (--target rb), or draw the
+         L → ∞ limit exactly from its Dirichlet/Beta posterior (--target exact).
       5) Form Wald CI: P_n(t) ± z * sqrt(V_{n,t}/n), and record coverage of F̂(t).
 
     Notes
     -----
     - We fix z for 95% CIs without SciPy; other levels warn and still use z≈1.95996.
     - RNG seeding uses a hash of (rep, n) to keep replicates independent.
-    - The continuation uses the SAME urn (same `xs` list), as required by Prop 2.6.
+    - The continuation uses the SAME urn (the prefix collapsed to an atom/count
+      table, see `src.polya.UrnTable`), as required by Prop 2.6.
+    - --engine vectorized (default) runs all M replicates of each n at once
+      (`src.prop26.prop26_block`: cell-projected urn, cumulative sums over the
+      indicator tensor, Dirichlet-multinomial tail); --engine loop is the
+      original per-replicate simulation. Same CSV schema and the same law,
+      different random streams.
+    - --nested grows ONE urn per replicate to max(--n) and reads P_n, V_{n,t},
+      the CI and its coverage at every n (checkpoints) against one shared
+      target per replicate, instead of regenerating a prefix per n; output
+      stem gets a `_nested` suffix. Cheap coverage-vs-n curves with many n.
+    - --adaptive runs replicates in batches of --batch and stops each (n, t)
+      cell once the binomial SE of its coverage (--coverage-se, default 0.01)
+      and/or the SE of its mean width (--width-se) reaches the target, or at
+      --M replicates; later batches only simulate the thresholds still
+      running. Output stem gets an `_adaptive` suffix; `analyze --prop26`
+      reports the achieved M (reps) and SEs per cell.
+    - --tail-tol makes the continuation adaptive: each replicate extends its
+      tail in blocks of --tail-block draws and stops once the predicted error
+      of F̂(t), sqrt(P(1−P)/L) with P = P_{n+L}(t) the urn's martingale, is at
+      most --tail-tol × the CI width at every t; --L becomes the cap and the
+      length used is logged per row (L_used). Output stem gets `_tail<tol>`.
+    - --target rb estimates F~(t) by P_{n+L}(t) = E[F~(t) | x_{1:n+L}] from the
+      same continuation (Rao–Blackwell): error variance
+      P(1−P)/(α+n+L+1) instead of ≈ P(1−P)/L, so a much shorter L reaches the
+      same coverage accuracy. Output stem gets `_rb`.
+    - With --cache-dir, finished blocks are reused across runs: one per n
+      (vectorized), per (n, rep) (loop), or per run/rep (nested); the engine
+      and mode are part of the key.
     """
     ap = argparse.ArgumentParser(
         description="Prop 2.6 predictive CIs for F~(t), with target via continuation on the SAME urn."
@@ -82,9 +233,37 @@ def main():
     ap.add_argument("--n",     nargs="+", type=int,   required=True, help="sample sizes n (one or more)")
     ap.add_argument("--M",     type=int, default=200, help="number of datasets (MC reps)")
     ap.add_argument("--L",     type=int, default=50000, help="tail length for continuation")
+    ap.add_argument("--target", choices=["continuation","exact","rb"], default="continuation",
+                    help="F~(t) via an L-step urn continuation, an exact draw of the limit, or the "
+                         "Rao-Blackwellized P_{n+L}(t) of the continuation")
+    ap.add_argument("--engine", choices=["vectorized","loop"], default="vectorized",
+                    help="NumPy engine over all M replicates (src.prop26), or the per-replicate loop")
+    ap.add_argument("--adaptive", action="store_true",
+                    help="run replicates in batches and stop each (n, t) cell at the SE target(s); "
+                         "--M becomes the per-cell cap")
+    ap.add_argument("--coverage-se", type=float, default=None,
+                    help="adaptive: target SE of coverage (default 0.01 if no --width-se)")
+    ap.add_argument("--width-se", type=float, default=None,
+                    help="adaptive: target SE of mean width")
+    ap.add_argument("--batch", type=int, default=50, help="adaptive: replicates per batch")
+    ap.add_argument("--nested", action="store_true",
+                    help="grow one urn per replicate to max(n) and record every n as a checkpoint")
+    ap.add_argument("--tail-tol", type=float, default=None,
+                    help="continuation: stop the tail once its predicted error is <= this "
+                         "fraction of the CI width (--L becomes the cap)")
+    ap.add_argument("--tail-block", type=int, default=1000,
+                    help="continuation: draws per tail block with --tail-tol")
     ap.add_argument("--level", type=float, default=0.95)
     ap.add_argument("--seed",  type=int, default=123)
+    ap.add_argument("--cache-dir", default=None,
+                    help="resumable cache of finished (n, rep) blocks (see src.cache.CellCache)")
     args = ap.parse_args()
+    if args.adaptive and args.nested:
+        ap.error("--adaptive stops (n, t) cells separately; it cannot be combined with --nested")
+    if args.tail_tol is not None and args.target == "exact":
+        ap.error("--tail-tol applies to the continuation and rb targets only")
+    if args.adaptive and args.coverage_se is None and args.width_se is None:
+        args.coverage_se = 0.01
 
     # z critical: avoid SciPy; exact for 0.95, warn otherwise
     if abs(args.level - 0.95) < 1e-12:
@@ -96,69 +275,82 @@ def main():
 
     outdir = Path("results/raw"); outdir.mkdir(parents=True, exist_ok=True)
 
-    rows = []
+    L_tag = "inf" if args.target == "exact" else args.L   # exact target ≡ L = ∞
+
+    # Optional cell cache: each (n, rep) block is keyed by its parameters, seed
+    # and the code version, so a re-run only computes missing blocks.
+    cache = CellCache(args.cache_dir, code=code_version([__file__])) if args.cache_dir else None
+
+    rows, frames = [], []   # loop: one dict per row; vectorized: one frame per n
     tvals = list(map(float, args.t))
     nvals = list(map(int,   args.n))
     alpha = float(args.alpha)
 
-    for n in nvals:
-        for rep in range(args.M):
-            # Independent per-(rep,n) seed to avoid path reuse across settings.
-            rng = np.random.default_rng(args.seed + 7919*rep + 104729*n)
-
-            # --- generate prefix x1..xn from the Pólya urn
-            xs = []
-            # Book-keeping for each t: K_m(t), previous P_{m-1}, running sum for V_{n,t}
-            Km = {t: 0 for t in tvals}
-            P_prev = {t: G0_cdf(t, args.base) for t in tvals}  # P0(t) = G0(t)
-            Vnt = {t: 0.0 for t in tvals}
-
-            for m in range(1, n+1):
-                # draw x_m using the same urn
-                x_m = draw_polya_next(xs, alpha, rng, base=args.base)
-                xs.append(x_m)
-
-                # update counts and P_m, accumulate m^2 (P_m - P_{m-1})^2
-                for t in tvals:
-                    if x_m <= t:
-                        Km[t] += 1
-                    Pm = (alpha*G0_cdf(t, args.base) + Km[t]) / (alpha + m)
-                    Vnt[t] += (m**2) * (Pm - P_prev[t])**2
-                    P_prev[t] = Pm     # becomes P_m for next step
-
-            # finalize V_{n,t}
-            for t in tvals:
-                Vnt[t] /= n
-
-            # P_n(t) for each t
-            Pn = {t: (alpha*G0_cdf(t, args.base) + Km[t]) / (alpha + n) for t in tvals}
-
-            # --- continuation: extend the SAME urn by L steps and estimate F~(t)
-            tail_leq = {t: 0 for t in tvals}
-            for j in range(args.L):
-                x_next = draw_polya_next(xs, alpha, rng, base=args.base)  # continues same xs/urn
-                xs.append(x_next)
-                for t in tvals:
-                    if x_next <= t:
-                        tail_leq[t] += 1
-            Fhat = {t: tail_leq[t] / float(args.L) for t in tvals}
-
-            # rows: record CI, coverage, width, and supporting quantities
-            for t in tvals:
-                se = math.sqrt(max(Vnt[t], 1e-12) / n)
-                lo = Pn[t] - z*se
-                hi = Pn[t] + z*se
-                covered = int(lo <= Fhat[t] <= hi)
-                rows.append({
-                    "rep": rep, "n": n, "alpha": alpha, "base": args.base, "t": t,
-                    "Pn": Pn[t], "Vnt": Vnt[t], "level": args.level, "z": z,
-                    "L": args.L, "Fhat": Fhat[t], "lo": lo, "hi": hi,
-                    "covered": covered, "width": 2*z*se
-                })
+    common = {"tvals": tvals, "alpha": alpha, "base": args.base, "target": args.target,
+              "L": args.L, "level": args.level, "z": z, "seed": args.seed}
+    if args.tail_tol is not None:   # only then, so cache keys of fixed-L runs are unchanged
+        common.update(tail_tol=args.tail_tol, tail_block=args.tail_block)
+    if args.adaptive:
+        # Batches of replicates per n, simulated only for the (n, t) cells that
+        # have not reached their SE target(s) yet; each cell stops on its own.
+        for n in nvals:
+            active, got, b = list(tvals), [], 0
+            while active:
+                m = b * args.batch
+                size = min(args.batch, args.M - m)
+                cell = {**common, "tvals": active}
+                if args.engine == "vectorized":
+                    params = {"n": n, "M": size, "batch": b, **cell}
+                    blk = cached(cache, "prop26_vectorized", params, lambda: prop26_block(**params))
+                    blk = blk.assign(rep=blk["rep"] + m)
+                else:
+                    out = []
+                    for rep in range(m, m + size):
+                        params = {"n": n, "rep": rep, **cell}
+                        out.extend(cached(cache, "prop26", params, lambda: simulate_rep(**params)))
+                    blk = pd.DataFrame(out)
+                got.append(blk); b += 1
+                acc = pd.concat(got, ignore_index=True)
+                for t in list(active):
+                    sub = acc[acc["t"] == t]
+                    ok = ((args.coverage_se is None or coverage_se(sub["covered"].to_numpy()) <= args.coverage_se)
+                          and (args.width_se is None or width_se(sub["width"].to_numpy()) <= args.width_se))
+                    if ok or len(sub) >= args.M:
+                        active.remove(t)
+            frames.append(acc)
+            used = acc.groupby("t")["rep"].nunique()
+            print(f"[adaptive] n={n}: M per t = " + ", ".join(f"{t:g}:{used[t]}" for t in tvals))
+    elif args.nested:
+        # One urn per replicate, read at every checkpoint n (rows in (n, rep, t) order).
+        if args.engine == "vectorized":
+            params = {"ns": nvals, "M": args.M, **common}
+            frames.append(cached(cache, "prop26_nested_vectorized", params,
+                                 lambda: prop26_nested(**params)))
+        else:
+            for rep in range(args.M):
+                params = {"nvals": nvals, "rep": rep, **common}
+                rows.extend(cached(cache, "prop26_nested", params,
+                                   lambda: simulate_rep_nested(**params)))
+            rows.sort(key=lambda r: r["n"])      # stable: keeps (rep, t) order within n
+    else:
+        for n in nvals:
+            if args.engine == "vectorized":
+                params = {"n": n, "M": args.M, **common}
+                frames.append(cached(cache, "prop26_vectorized", params, lambda: prop26_block(**params)))
+                continue
+            for rep in range(args.M):
+                params = {"n": n, "rep": rep, **common}
+                rows.extend(cached(cache, "prop26", params, lambda: simulate_rep(**params)))
 
     # Persist results
-    df = pd.DataFrame(rows)
-    stem = f"prop26_M{args.M}_L{args.L}_a{alpha}_seed{args.seed}_{args.base}.csv"
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(rows)
+    mode = "_nested" if args.nested else "_adaptive" if args.adaptive else ""
+    if args.target == "rb":
+        mode += "_rb"
+    if args.tail_tol is not None:
+        mode += f"_tail{args.tail_tol:g}"
+        print(f"[tail] mean L used = {df['L_used'].mean():.0f} of L = {args.L}")
+    stem = f"prop26_M{args.M}_L{L_tag}_a{alpha}_seed{args.seed}_{args.base}{mode}.csv"
     out = outdir / stem
     df.to_csv(out, index=False)
     print(f"[ok] wrote {out}")
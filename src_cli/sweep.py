@@ -0,0 +1,191 @@
+from __future__ import annotations
+import argparse, ast, functools, operator, os, shutil, time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import pandas as pd
+import yaml
+
+from src.cache import CellCache, cached, code_version
+from src.simulation import simulate_stream, write_stream
+from src.storage import append_dataset
+
+# Arithmetic allowed in `seeding.rule` (integers only, no calls/attributes).
+_OPS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+        ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+        ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+def seed_rule(rule: str = "seed = base + 1000*n + rep"):
+    """Compile the config's seeding rule into a function seed(base, n, rep).
+
+    Parameters
+    ----------
+    rule : str
+        Assignment of the form "seed = <expr>", where <expr> is integer
+        arithmetic (+ - * // % **) over the names `base`, `n` and `rep`.
+
+    Returns
+    -------
+    callable
+        f(base, n, rep) -> int. The expression is parsed once and evaluated
+        without `eval`, so a config cannot run arbitrary code.
+    """
+    lhs, sep, rhs = rule.partition("=")
+    if not sep or lhs.strip() != "seed":
+        raise ValueError(f"seeding rule must look like 'seed = <expr>': {rule!r}")
+    tree = ast.parse(rhs.strip(), mode="eval").body
+
+    def ev(node, env):
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.Name) and node.id in env:
+            return env[node.id]
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPS:
+            return _OPS[type(node.op)](ev(node.left, env), ev(node.right, env))
+        if isinstance(node, ast.UnaryOp) and type(node.op) in _OPS:
+            return _OPS[type(node.op)](ev(node.operand, env))
+        raise ValueError(f"unsupported expression in seeding rule: {ast.unparse(node)!r}")
+
+    ev(tree, {"base": 0, "n": 0, "rep": 0})  # validate eagerly
+    return lambda base, n, rep: int(ev(tree, {"base": int(base), "n": int(n), "rep": int(rep)}))
+
+def sweep_cells(cfg: dict, reps: int | None = None) -> list[dict]:
+    """Expand a config into one `run_stream` kwargs dict (+ `rep`) per (n, rep, method) cell.
+
+    Seeds depend only on (n, rep) through the config's seeding rule, never on
+    scheduling, so the outputs are identical for any number of workers.
+    """
+    raw_dir = cfg["io"]["raw_dir"]
+    grid = cfg["grid"]
+    seeding = cfg.get("seeding", {})
+    seed_of = seed_rule(seeding.get("rule", "seed = base + 1000*n + rep"))
+    base_seed = int(seeding.get("base", 0))
+    method_params = cfg.get("method_params", {}) or {}
+    reps = int(cfg["reps"]) if reps is None else int(reps)
+    # Optional `metrics.schedule` ("log:K", "every:K", ...) overrides record_every,
+    # and `metrics.distances` selects the MetricEngine metrics (one column each).
+    schedule = cfg["metrics"].get("schedule")
+    extra = {} if schedule is None else {"schedule": schedule}
+    if cfg["metrics"].get("distances"):
+        extra["distances"] = list(cfg["metrics"]["distances"])
+
+    cells = []
+    for n in cfg["n"]:
+        for rep in range(reps):
+            seed = seed_of(base_seed, n, rep)
+            for method in cfg["methods"]:
+                cells.append(dict(
+                    rep=int(rep), method_name=method, n=int(n), J=int(grid["J"]),
+                    tmin=float(grid["tmin"]), tmax=float(grid["tmax"]),
+                    record_every=int(cfg["metrics"]["record_every"]), seed=seed,
+                    out_path=os.path.join(raw_dir, f"{method}_n{int(n)}_rep{int(rep)}.parquet"),
+                    **extra, **method_params.get(method, {}),
+                ))
+    return cells
+
+_CACHES: dict[tuple[str, str], CellCache] = {}
+
+def _cache(root: str | None, code: str | None) -> CellCache | None:
+    # One CellCache (manifest read once) per process and cache directory.
+    if root is None:
+        return None
+    if (root, code) not in _CACHES:
+        _CACHES[(root, code)] = CellCache(root, code=code)
+    return _CACHES[(root, code)]
+
+def _stream_params(kwargs: dict) -> dict:
+    # `simulate_stream` arguments of a cell (its cache identity): rep and the
+    # output path do not change the result (the seed already encodes rep).
+    return {k: v for k, v in kwargs.items() if k not in ("rep", "out_path")}
+
+def _run_cell(kwargs: dict, sink: str = "files", cache_root: str | None = None,
+              code: str | None = None):
+    """Worker entry point (top level so it pickles for the process pool).
+
+    Computes (or loads from the cell cache) one stream log. The "files" sink
+    writes it to the cell's parquet file and returns the path; the "dataset"
+    sink returns the log tagged with `rep` for the parent to append.
+    """
+    sim = _stream_params(kwargs)
+    df = cached(_cache(cache_root, code), "stream", sim, lambda: simulate_stream(**sim))
+    if sink == "files":
+        return write_stream(df, kwargs["out_path"])
+    df = df.copy()
+    df.insert(1, "rep", kwargs["rep"])
+    return df
+
+def main():
+    """Run a (n × reps × methods) sweep from a YAML config on a process pool.
+
+    Sinks
+    -----
+    - "dataset" (default): workers return their logs and the parent appends
+      them, in cell order and in batches of `--flush-rows`, to one
+      Hive-partitioned dataset (method/n) at `--dataset`
+      (default {raw_dir}/streams); see `src.storage.read_dataset`.
+    - "files": each cell writes {raw_dir}/{method}_n{n}_rep{rep}.parquet
+      (legacy layout).
+
+    `--workers 1` runs in-process without a pool. With `--cache-dir`, every
+    finished cell is stored under a hash of its parameters, seed and code
+    version (`src.cache.CellCache`), so a killed or repeated sweep only
+    computes the missing/invalidated cells.
+    """
+    ap = argparse.ArgumentParser(description="Process-pool sweep runner driven by a YAML config.")
+    ap.add_argument("--config", required=True)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="worker processes (default: all cores)")
+    ap.add_argument("--reps", type=int, default=None, help="override the config's reps (quick runs)")
+    ap.add_argument("--sink", choices=["dataset","files"], default="dataset",
+                    help="one partitioned parquet dataset, or one file per cell (legacy)")
+    ap.add_argument("--dataset", default=None, help="dataset root (default: <raw_dir>/streams)")
+    ap.add_argument("--flush-rows", type=int, default=1_000_000,
+                    help="buffer this many rows before each dataset append")
+    ap.add_argument("--overwrite", action="store_true",
+                    help="replace an existing dataset instead of refusing to append to it")
+    ap.add_argument("--append", action="store_true", help="append to an existing dataset")
+    ap.add_argument("--cache-dir", default=None,
+                    help="resumable cell cache (content-addressed results + manifest)")
+    args = ap.parse_args()
+
+    cfg = yaml.safe_load(open(args.config, "r"))
+    raw_dir = cfg["io"]["raw_dir"]
+    Path(raw_dir).mkdir(parents=True, exist_ok=True)
+    cells = sweep_cells(cfg, reps=args.reps)
+    workers = max(1, min(args.workers, len(cells)))
+
+    root = args.dataset or os.path.join(raw_dir, "streams")
+    if args.sink == "dataset" and os.path.exists(root) and not args.append:
+        if not args.overwrite:
+            raise SystemExit(f"[sweep] dataset {root} exists; pass --append or --overwrite")
+        shutil.rmtree(root)
+    dest = root if args.sink == "dataset" else raw_dir
+    print(f"[sweep] {len(cells)} cells on {workers} worker(s) -> {dest}")
+
+    t0 = time.perf_counter()
+    code = code_version([__file__]) if args.cache_dir else None
+    if args.cache_dir:
+        cache = _cache(args.cache_dir, code)
+        hits = sum(cache.has(cache.key("stream", _stream_params(kw))) for kw in cells)
+        print(f"[sweep] cache {args.cache_dir}: {hits}/{len(cells)} cells done")
+    fn = functools.partial(_run_cell, sink=args.sink, cache_root=args.cache_dir, code=code)
+    buf, rows = [], 0
+    ex = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        # `map` yields in cell order, so the dataset is identical for any worker count.
+        results = ex.map(fn, cells, chunksize=max(1, len(cells) // (4 * workers))) if ex else map(fn, cells)
+        for res in results:
+            if args.sink != "dataset":
+                continue
+            buf.append(res); rows += len(res)
+            if rows >= args.flush_rows:
+                append_dataset(pd.concat(buf, ignore_index=True), root)
+                buf, rows = [], 0
+        if buf:
+            append_dataset(pd.concat(buf, ignore_index=True), root)
+    finally:
+        if ex:
+            ex.shutdown()
+    print(f"[ok] {len(cells)} cells in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
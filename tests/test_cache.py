@@ -0,0 +1,51 @@
+from pathlib import Path
+import numpy as np
+from src.cache import CellCache, cached
+from src_cli.partc_log_prop26 import simulate_rep
+
+def test_cell_cache_resume_and_invalidation(tmp_path: Path):
+    # Finished cells are found again by a fresh cache object (resume); a new
+    # code version or different parameters/seed give different keys.
+    root = str(tmp_path / "cache")
+    calls = []
+    def compute():
+        calls.append(1)
+        return {"x": np.arange(3)}
+
+    params = {"n": 10, "seed": 1, "L": float("inf")}
+    c1 = CellCache(root, code="v1")
+    cached(c1, "demo", params, compute)
+    out = cached(CellCache(root, code="v1"), "demo", params, compute)
+    assert len(calls) == 1 and np.array_equal(out["x"], np.arange(3))
+
+    cached(CellCache(root, code="v2"), "demo", params, compute)
+    assert len(calls) == 2
+    assert c1.key("demo", params) != c1.key("demo", {**params, "seed": 2})
+
+    # A torn manifest line (killed run) is ignored; intact records survive.
+    with open(Path(root) / "manifest.jsonl", "a") as fh:
+        fh.write('{"key": "abc')
+    assert CellCache(root, code="v1").has(c1.key("demo", params))
+
+def test_cell_cache_put_after_torn_manifest(tmp_path: Path):
+    # A record appended after a line cut mid-way (killed run) stays readable.
+    root = tmp_path / "cache"
+    c = CellCache(str(root), code="v1")
+    c.put(c.key("demo", {"i": 0}), 0, "demo", {"i": 0})
+    c.put(c.key("demo", {"i": 1}), 1, "demo", {"i": 1})
+    man = root / "manifest.jsonl"
+    man.write_bytes(man.read_bytes()[:-20])          # truncate the last record mid-line
+    c = CellCache(str(root), code="v1")
+    assert c.has(c.key("demo", {"i": 0})) and not c.has(c.key("demo", {"i": 1}))
+    c.put(c.key("demo", {"i": 2}), 2, "demo", {"i": 2})
+    fresh = CellCache(str(root), code="v1")
+    assert fresh.has(c.key("demo", {"i": 2})) and fresh.get(c.key("demo", {"i": 2})) == 2
+
+def test_prop26_block_cached_equals_fresh(tmp_path: Path):
+    # A cached Part C (n, rep) block reproduces the freshly computed rows.
+    params = dict(n=30, rep=2, tvals=[0.25, 0.5], alpha=5.0, base="uniform",
+                  target="continuation", L=500, level=0.95, z=1.959963984540054, seed=7)
+    cache = CellCache(str(tmp_path / "cache"))
+    first = cached(cache, "prop26", params, lambda: simulate_rep(**params))
+    again = cached(CellCache(str(tmp_path / "cache")), "prop26", params, lambda: None)
+    assert first == again == simulate_rep(**params)
@@ -1,5 +1,6 @@
+import pytest
 import numpy as np
-from src.methods import PolyaPredictive
+from src.methods import PolyaGridPredictive, PolyaPredictive
 from src.metrics import make_grid
 from src.dgps import UniformTruth
 
@@ -27,3 +28,90 @@ def test_polya_order_invariance():
 
     # Exact equality should hold since updates are deterministic given the same set.
     assert np.array_equal(c1, c2)
+
+def test_array_state_matches_list_state():
+    # The preallocated sorted state (init_state(max_n=...)) must reproduce the
+    # list state exactly, including ties, scalar t, and growth past max_n.
+    x = np.round(UniformTruth(0.0, 1.0).sample(300, seed=7), 2)
+    grid = make_grid(J=50, tmin=0.0, tmax=1.0)
+    m = PolyaPredictive(alpha=5.0, base="uniform")
+
+    st_list, st_arr = m.init_state(), m.init_state(max_n=100)
+    assert np.array_equal(m.cdf_est(st_list, grid), m.cdf_est(st_arr, grid))
+    for xi in x:
+        assert m.cdf_est(st_list, float(xi)) == m.cdf_est(st_arr, float(xi))
+        st_list = m.update(st_list, float(xi))
+        st_arr = m.update(st_arr, float(xi))
+        assert np.array_equal(m.cdf_est(st_list, grid), m.cdf_est(st_arr, grid))
+    assert np.array_equal(st_arr["buf"][:st_arr["n"]], x)
+
+def test_grid_predictive_matches_list_state():
+    # Fenwick grid counts reproduce the list-state CDF on the grid, including
+    # observations that sit exactly on grid points or outside the grid.
+    grid = make_grid(J=40, tmin=0.0, tmax=1.0)
+    x = np.concatenate([grid[:3], [-1.0, 2.0], UniformTruth(0.0, 1.0).sample(200, seed=3)])
+    m = PolyaPredictive(alpha=2.0, base="uniform")
+    mg = PolyaGridPredictive(alpha=2.0, base="uniform", grid=grid)
+
+    st, stg = m.init_state(), mg.init_state(max_n=len(x))
+    for xi in x:
+        st, stg = m.update(st, float(xi)), mg.update(stg, float(xi))
+        assert np.array_equal(m.cdf_est(st, grid), mg.cdf_grid(stg))
+    assert np.array_equal(m.cdf_est(st, grid), mg.cdf_est(stg, grid))
+    assert m.cdf_est(st, 0.123) == mg.cdf_est(stg, 0.123)
+
+    # Grid-only state (no raw history): same grid CDF, off-grid queries refused.
+    mh = PolyaGridPredictive(alpha=2.0, base="uniform", grid=grid, history=False)
+    sth = mh.init_state()
+    for xi in x:
+        sth = mh.update(sth, float(xi))
+    assert set(sth) == {"n", "tree"} and np.array_equal(mh.cdf_grid(sth), mg.cdf_grid(stg))
+    with pytest.raises(ValueError):
+        mh.cdf_est(sth, 0.123)
+
+def test_path_matches_sequential_updates():
+    # path() reproduces cdf_est after m updates for every (recorded) step m.
+    x = np.round(UniformTruth(0.0, 1.0).sample(150, seed=5), 2)
+    grid = make_grid(J=30, tmin=0.0, tmax=1.0)[::-1]  # unsorted thresholds are fine
+    m = PolyaPredictive(alpha=5.0, base="uniform")
+
+    P = m.path(x, grid)
+    assert P.shape == (151, 30)
+    st = m.init_state()
+    for i in range(151):
+        assert np.array_equal(P[i], m.cdf_est(st, grid))
+        if i < 150:
+            st = m.update(st, float(x[i]))
+    assert np.array_equal(m.path(x, grid, steps=[150, 10, 0]), P[[150, 10, 0]])
+
+def test_alpha_vector_matches_scalar_methods():
+    # An α array evaluates every α from one set of counts; each row must equal
+    # the corresponding scalar-α method exactly.
+    alphas = [1.0, 5.0, 20.0]
+    x = UniformTruth(0.0, 1.0).sample(100, seed=9)
+    grid = make_grid(J=25, tmin=0.0, tmax=1.0)
+    mv = PolyaPredictive(alpha=alphas, base="uniform")
+
+    st = mv.init_state(max_n=len(x))
+    for xi in x:
+        st = mv.update(st, float(xi))
+    C, P = mv.cdf_est(st, grid), mv.path(x, grid, steps=[0, 50, 100])
+    assert C.shape == (3, 25) and P.shape == (3, 3, 25)
+    for k, a in enumerate(alphas):
+        m = PolyaPredictive(alpha=a, base="uniform")
+        assert np.array_equal(C[k], m.path(x, grid, steps=[100])[0])
+        assert np.array_equal(P[k], m.path(x, grid, steps=[0, 50, 100]))
+
+def test_path_replicate_matrix_matches_rows():
+    # An (R, n) matrix of streams gives each row's own path (and chunk offsets per row).
+    X = np.random.default_rng(3).uniform(size=(3, 200))
+    t = np.array([0.8, 0.1, 0.5])
+    pred = PolyaPredictive(alpha=[0.5, 4.0], base="uniform")
+    steps = np.array([0, 7, 150, 200])
+    P = pred.path(X, t, steps)
+    assert P.shape == (2, 3, steps.size, t.size)
+    for r in range(3):
+        assert np.array_equal(P[:, r], pred.path(X[r], t, steps))
+    k0 = np.arange(9).reshape(3, 3)
+    Pc = pred.path(X, t, steps + 20, m0=20, k0=k0)
+    assert np.array_equal(Pc[:, 1], pred.path(X[1], t, steps + 20, m0=20, k0=k0[1]))
@@ -1,5 +1,7 @@
 import numpy as np
-from src.polya import PolyaSequenceModel, build_prefix, continue_urn_once, sample_prior_once
+from src.polya import (PolyaSequenceModel, PolyaBatchSampler, UrnTable, build_prefix,
+                       continue_table, continue_urn_once, continued_mass_pmf, sample_limit,
+                       sample_prior_once, PolyaCellSampler, StickBreakingSampler)
 
 def test_shapes_and_bounds():
     # Basic sanity checks for the Pólya sequence helpers with Uniform(0,1) base.
@@ -16,3 +18,128 @@ def test_shapes_and_bounds():
     # Prior (unconditional) sequence of length 50
     prior = sample_prior_once(50, model)
     assert len(prior) == 50
+
+def test_batch_sampler_matches_urn_law():
+    # Vectorized engine: prefix is kept, values stay in the support, and the
+    # number of distinct atoms matches E[K_M] = Σ_{m<M} α/(α+m).
+    sampler = PolyaBatchSampler(alpha=3.0, base="uniform", rng=np.random.default_rng(1))
+    pref = [0.1, 0.2, 0.2, 0.9]
+    X = sampler.sample(400, 300, prefix=pref)
+    assert X.shape == (400, 300)
+    assert np.all(X[:, :4] == pref) and X.min() >= 0 and X.max() <= 1
+
+    prior = sampler.sample(2000, 200)
+    k_mean = np.mean([np.unique(row).size for row in prior])
+    k_theory = sum(3.0 / (3.0 + m) for m in range(200))
+    assert abs(k_mean - k_theory) < 0.5
+
+def test_table_continuation_keeps_counts():
+    # Atom/count state: counts of existing atoms only grow, totals add up,
+    # and K(t) agrees with the sequence it was built from.
+    model = PolyaSequenceModel(alpha=2.0, base="uniform", rng=np.random.default_rng(3))
+    pref = build_prefix(50, model)
+    table = UrnTable.from_sequence(pref)
+    assert table.n == 50
+    assert table.count_leq(0.5) == sum(x <= 0.5 for x in pref)
+
+    cont = continue_table(table, model, 5000)
+    K = table.atoms.size
+    assert cont.n == 5050
+    assert np.array_equal(cont.atoms[:K], table.atoms)
+    assert np.all(cont.counts[:K] >= table.counts)
+    assert cont.atoms.size < 100    # O(α log n) atoms, not O(n)
+
+def test_exact_limit_has_beta_marginals():
+    # P~((−∞,t]) | x_{1:n} ~ Beta(αt + K_n(t), α(1−t) + n − K_n(t)) for U(0,1) base;
+    # joint draws over several t must also be nondecreasing in t.
+    model = PolyaSequenceModel(alpha=4.0, base="uniform", rng=np.random.default_rng(5))
+    pref = build_prefix(60, model)
+    ts = [0.75, 0.25, 0.5]
+    draws = sample_limit(pref, ts, model, size=20000)
+    assert draws.shape == (20000, 3)
+    assert np.all(draws[:, 1] <= draws[:, 2]) and np.all(draws[:, 2] <= draws[:, 0])
+    for j, t in enumerate(ts):
+        K = sum(x <= t for x in pref)
+        a, b = 4.0 * t + K, 4.0 * (1 - t) + 60 - K
+        assert abs(draws[:, j].mean() - a / (a + b)) < 0.005
+
+def test_continued_mass_pmf_matches_simulation():
+    # Exact Beta-binomial law of the continued mass vs. batch continuations.
+    model = PolyaSequenceModel(alpha=5.0, base="uniform", rng=np.random.default_rng(7))
+    assert build_prefix(0, model) == []
+    pref = build_prefix(30, model)
+    k_n = sum(x <= 0.5 for x in pref)
+    support, pmf = continued_mass_pmf(k_n, 30, 90, 5.0, 0.5)
+    assert np.isclose(pmf.sum(), 1.0) and support[0] == k_n / 90
+
+    X = PolyaBatchSampler(alpha=5.0, rng=np.random.default_rng(8)).sample(20000, 90, prefix=pref)
+    mass = np.mean(X <= 0.5, axis=1)
+    mean = np.sum(support * pmf)
+    var = np.sum(support**2 * pmf) - mean**2
+    assert abs(mass.mean() - mean) < 5 * np.sqrt(var / 20000)
+    assert abs(mass.var() / var - 1) < 0.05
+
+def test_stick_breaking_measures():
+    # Whole-measure draws: proper weights, TV truncation respected, and the
+    # masses on (−∞,t] reproduce the exact Beta posterior moments.
+    model = PolyaSequenceModel(alpha=5.0, base="uniform", rng=np.random.default_rng(9))
+    pref = build_prefix(80, model)
+    sb = StickBreakingSampler(alpha=5.0, base="uniform", rng=np.random.default_rng(10))
+    draws = sb.sample(5000, prefix=pref, tv_tol=1e-3)
+    assert np.allclose(draws.weights.sum(axis=1), 1.0)
+    assert np.all(draws.weights[:, -1] >= 0)
+
+    ts = [0.25, 0.5, 0.75]
+    F = draws.cdf(ts)
+    assert F.shape == (5000, 3) and np.all(np.diff(F, axis=1) >= 0)
+    for j, t in enumerate(ts):
+        K = sum(x <= t for x in pref)
+        a, b = 5.0 * t + K, 5.0 * (1 - t) + 80 - K
+        mean, var = a / (a + b), a * b / ((a + b) ** 2 * (a + b + 1))
+        assert abs(F[:, j].mean() - mean) < 5 * np.sqrt(var / 5000) + 1e-3
+        assert abs(F[:, j].var() / var - 1) < 0.1
+
+def test_cell_sampler_counts_and_law():
+    # Cell counts reproduce K(t) in the caller's threshold order, and the
+    # continued mass follows the exact Beta-binomial law.
+    model = PolyaSequenceModel(alpha=5.0, base="uniform", rng=np.random.default_rng(11))
+    pref = build_prefix(40, model)
+    ts = [0.75, 0.25]
+    cells = PolyaCellSampler(alpha=5.0, base="uniform", ts=ts, rng=np.random.default_rng(12))
+    c0 = cells.counts_of(pref)
+    assert c0.sum() == 40
+    assert list(cells.K(c0)) == [sum(x <= t for x in pref) for t in ts]
+
+    C, path = cells.sample(10000, 60, counts=c0, record=True)
+    assert C.shape == (10000, 3) and path.shape == (10000, 60)
+    assert np.all(C.sum(axis=1) == 100)
+    assert np.array_equal(C - c0, np.stack([(path == c).sum(axis=1) for c in range(3)], axis=1))
+
+    k_n = sum(x <= 0.25 for x in pref)
+    support, pmf = continued_mass_pmf(k_n, 40, 100, 5.0, 0.25)
+    mass = cells.K(C)[:, 1] / 100
+    mean = np.sum(support * pmf)
+    var = np.sum(support**2 * pmf) - mean**2
+    assert abs(mass.mean() - mean) < 5 * np.sqrt(var / 10000)
+    # Counts-only draws (no path) follow the same law.
+    mass = cells.K(cells.sample(10000, 60, counts=c0))[:, 1] / 100
+    assert abs(mass.mean() - mean) < 5 * np.sqrt(var / 10000)
+    assert abs(mass.var() / var - 1) < 0.1
+
+def test_vectorized_prop26_engine():
+    # Same schema as the loop engine; under the urn law E[P_n(t)] = E[F~(t)] = G0(t)
+    # and the Wald interval covers F~(t) at roughly the nominal rate.
+    from src.prop26 import PROP26_COLUMNS, prop26_block
+    from src_cli.partc_log_prop26 import simulate_rep
+    z = 1.959963984540054
+    kw = dict(n=60, tvals=[0.7, 0.3], alpha=4.0, base="uniform", L=500, level=0.95, z=z, seed=5)
+    loop = simulate_rep(rep=0, target="continuation", **kw)
+    df = prop26_block(M=3000, target="exact", **kw)
+    assert list(df.columns) == PROP26_COLUMNS == list(loop[0])
+    assert len(df) == 6000 and list(df["t"][:2]) == [0.7, 0.3] and np.isinf(df["L"]).all()
+    for t, g in df.groupby("t"):
+        se = g["Fhat"].std() / np.sqrt(len(g))
+        assert abs(g["Fhat"].mean() - t) < 4 * se and abs(g["Pn"].mean() - t) < 4 * se
+        assert 0.85 < g["covered"].mean() < 0.99
+    cont = prop26_block(M=50, target="continuation", **kw)
+    assert (cont["L"] == 500).all() and np.allclose(cont["Fhat"] * 500, np.round(cont["Fhat"] * 500))
@@ -30,3 +30,104 @@ def test_reproducible_output(tmp_path: Path):
     df2 = pd.read_parquet(out2, engine="fastparquet")
     # exact equality with fixed RNG + same code path
     assert df1.equals(df2)
+
+def test_vectorized_stream_matches_loop(tmp_path: Path):
+    # The whole-stream evaluation (prequential ranks + path) must reproduce the
+    # per-step loop exactly, for a scalar α and for an α sweep.
+    for alpha in (5.0, [1.0, 20.0]):
+        kwargs = dict(method_name="polya_dp", n=150, J=15, tmin=-3.0, tmax=3.0,
+                      record_every=7, seed=11, alpha=alpha, base="normal")
+        run_stream(out_path=str(tmp_path / "vec.parquet"), **kwargs)
+        run_stream(out_path=str(tmp_path / "loop.parquet"), vectorized=False, **kwargs)
+        df_vec = pd.read_parquet(tmp_path / "vec.parquet", engine="fastparquet")
+        df_loop = pd.read_parquet(tmp_path / "loop.parquet", engine="fastparquet")
+        assert df_vec.equals(df_loop)
+
+def test_vectorized_stream_short(tmp_path: Path):
+    # n ≤ 1 records no distances; the vectorized path must match the loop there too.
+    from src.simulation import simulate_stream
+    for n in (0, 1):
+        kwargs = dict(method_name="polya_dp", n=n, J=5, tmin=0.0, tmax=1.0, record_every=1,
+                      seed=2, exact=True, alpha=[1.0, 5.0], base="uniform")
+        df_vec = simulate_stream(**kwargs)
+        assert len(df_vec) == 2 * n and df_vec.equals(simulate_stream(vectorized=False, **kwargs))
+
+def test_recording_schedules(tmp_path: Path):
+    # Schedules select the recorded steps and always include the final step.
+    from src.metrics import record_steps
+    assert record_steps(10, "all").tolist() == list(range(1, 10))
+    assert record_steps(25, 10).tolist() == record_steps(25, "every:10").tolist() == [10, 20, 24]
+    assert record_steps(1000, "log:2").tolist() == [1, 3, 10, 32, 100, 316, 999]
+    assert record_steps(50, "list:3,7").tolist() == record_steps(50, [7, 3, 99]).tolist() == [3, 7, 49]
+
+    out = tmp_path / "log.parquet"
+    run_stream(method_name="polya_dp", n=2000, J=10, tmin=0.0, tmax=1.0, record_every=1,
+               seed=5, out_path=str(out), schedule="log:5", alpha=5.0, base="uniform")
+    df = pd.read_parquet(out, engine="fastparquet")
+    rec = df.loc[df["d_infty"].notna(), "i"].tolist()
+    assert rec == record_steps(2000, "log:5").tolist() and rec[-1] == 1999
+
+def test_exact_sup_norm(tmp_path: Path):
+    # The exact sup norm bounds any grid sup norm from above, matches a very fine
+    # grid, and the incremental tracker (per-step or block updates) agrees with it.
+    import numpy as np
+    from src.dgps import NormalTruth
+    from src.methods import PolyaPredictive
+    from src.metrics import ExactSupNorm, d_infty_exact
+
+    truth = NormalTruth()
+    x = truth.sample(300, seed=4)
+    pred = PolyaPredictive(alpha=3.0, base="normal")
+    state = pred.init_state(max_n=300)
+    for v in x:
+        pred.update(state, v)
+    t = np.linspace(-6.0, 6.0, 400_001)
+    fine = np.max(np.abs(pred.cdf_est(state, t) - truth.cdf_truth(t)))
+    exact = d_infty_exact(x, truth.cdf_truth, alpha=3.0)
+    assert fine <= exact + 1e-15 and exact - fine < 1e-4
+
+    sup = ExactSupNorm(truth.cdf_truth, alpha=[3.0, 0.0], max_n=2)
+    for v in x[:120]:
+        sup.update(v)
+    sup.extend(x[120:])
+    assert np.array_equal(sup.value(), [exact, d_infty_exact(x, truth.cdf_truth)])
+
+    kwargs = dict(method_name="polya_dp", n=200, J=15, tmin=-3.0, tmax=3.0, record_every=20,
+                  seed=9, exact=True, alpha=[1.0, 20.0], base="normal")
+    run_stream(out_path=str(tmp_path / "vec.parquet"), **kwargs)
+    run_stream(out_path=str(tmp_path / "loop.parquet"), vectorized=False, **kwargs)
+    df_vec = pd.read_parquet(tmp_path / "vec.parquet", engine="fastparquet")
+    assert df_vec.equals(pd.read_parquet(tmp_path / "loop.parquet", engine="fastparquet"))
+    rec = df_vec.dropna(subset=["d_sup"])
+    assert (rec["d_sup"] >= rec["d_infty"]).all()
+
+def test_metric_engine(tmp_path: Path):
+    # One engine computes every selected metric; batched rows equal single calls,
+    # d_infty/d_rmse equal the standalone functions, and the buffers are reused.
+    import numpy as np, pytest
+    from src.dgps import NormalTruth
+    from src.metrics import MetricEngine, d_infty, d_rmse, make_grid
+
+    c_true = NormalTruth().cdf_truth(make_grid(60, -4.0, 4.0))
+    eng = MetricEngine(MetricEngine.METRICS, c_true)
+    C = np.random.default_rng(2).random((8, 60))
+    batch = eng.compute(C)
+    bufs = eng._bufs[C.shape]
+    assert eng.compute(C + 0.0)["d_ad"].tolist() == batch["d_ad"].tolist() and eng._bufs[C.shape] is bufs
+    for r, c in enumerate(C):
+        row = eng.compute(c)
+        assert row == {m: batch[m][r] for m in MetricEngine.METRICS}
+        assert row["d_infty"] == d_infty(c, c_true) and row["d_rmse"] == d_rmse(c, c_true)
+    shift = eng.compute(c_true + 0.1)
+    assert abs(shift["d_l1"] - 0.1) < 1e-12 and abs(shift["d_cvm"] - 0.01) < 1e-4
+    with pytest.raises(ValueError):
+        MetricEngine(["d_kl"], c_true)
+
+    # `distances` selects the logged columns (vectorized and loop agree).
+    kwargs = dict(method_name="polya_dp", n=120, J=25, tmin=0.0, tmax=1.0, record_every=10,
+                  seed=3, distances=["d_l1", "d_cvm", "d_infty"], alpha=2.0, base="uniform")
+    run_stream(out_path=str(tmp_path / "vec.parquet"), **kwargs)
+    run_stream(out_path=str(tmp_path / "loop.parquet"), vectorized=False, **kwargs)
+    df = pd.read_parquet(tmp_path / "vec.parquet", engine="fastparquet")
+    assert df.equals(pd.read_parquet(tmp_path / "loop.parquet", engine="fastparquet"))
+    assert [c for c in df.columns if c.startswith("d_")] == ["d_l1", "d_cvm", "d_infty"]
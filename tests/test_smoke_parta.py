@@ -16,3 +16,16 @@ def test_parta_prior_runs(tmp_path):
     # Confirm at least one prior panel image was written in the standard location.
     figs = list(pathlib.Path("results/figures").glob("post_panels_cont_n0_*.png"))
     assert figs, "expected a prior panel PNG to be written"
+
+def test_parta_rejects_short_continuation():
+    # M below the prefix length is an input error for every engine.
+    import numpy as np
+    import pytest
+    from src.polya import PolyaSequenceModel, build_prefix
+    from src_cli.parta_panels import continued_masses
+    model = PolyaSequenceModel(alpha=5.0, rng=np.random.default_rng(0))
+    x_obs = build_prefix(20, model)
+    for engine in ("cells", "batch", "table", "loop"):
+        with pytest.raises(ValueError, match="shorter than the prefix"):
+            continued_masses(x_obs, [0.5], model, M=10, N=5, engine=engine)
+    assert continued_masses(x_obs, [0.5], model, M=20, N=5).shape == (5, 1)
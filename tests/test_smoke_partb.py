@@ -1,4 +1,5 @@
 from pathlib import Path
+import numpy as np
 import pandas as pd, subprocess, sys
 
 def test_partb_smoke(tmp_path: Path):
@@ -16,3 +17,33 @@ def test_partb_smoke(tmp_path: Path):
     # Basic schema check for the distances file.
     d = pd.read_csv(raw / "distances_partB_n50_a5.0_seed123_uniform.csv")
     assert {"i","d_infty","d_rmse"} <= set(d.columns)
+
+def test_partb_chunked_matches_one_shot():
+    # Streaming in small chunks must reproduce the one-shot run byte for byte.
+    raw = Path("results/raw")
+    stem = "partB_n120_a2.0_seed7_normal"
+    base = [sys.executable, "-m", "src_cli.partb_log_convergence",
+            "--n", "120", "--alpha", "2", "--t", "-0.5", "0.5", "--seed", "7", "--base", "normal"]
+    out = {}
+    for chunk in ("1000", "17"):
+        subprocess.run(base + ["--chunk", chunk], check=True)
+        out[chunk] = [(raw / f"{k}_{stem}.csv").read_bytes() for k in ("distances", "Pm_paths")]
+    assert out["1000"] == out["17"]
+
+def test_partb_bands_match_separate_runs():
+    # --reps R evaluates R streams (seeds seed..seed+R-1) in lockstep; the band mean
+    # must equal the mean over R single-stream runs of those seeds.
+    raw = Path("results/raw")
+    cmd = [sys.executable, "-m", "src_cli.partb_log_convergence",
+           "--n", "80", "--alpha", "3", "--t", "0.5", "--base", "uniform", "--record", "every:10"]
+    singles = []
+    for r in range(3):
+        subprocess.run(cmd + ["--seed", str(40 + r)], check=True)
+        singles.append(pd.read_csv(raw / f"distances_partB_n80_a3.0_seed{40 + r}_uniform.csv"))
+    subprocess.run(cmd + ["--seed", "40", "--reps", "3", "--chunk", "60"], check=True)
+    b = pd.read_csv(raw / "bands_partB_n80_a3.0_seed40_uniform.csv")
+    assert list(b["i"]) == list(singles[0]["i"])
+    for d in ("d_infty", "d_rmse"):
+        mean = sum(s[d] for s in singles) / 3
+        assert np.allclose(b[f"{d}_mean"], mean, rtol=0, atol=1e-12)
+        assert (b[f"{d}_lo"] <= b[f"{d}_med"]).all() and (b[f"{d}_med"] <= b[f"{d}_hi"]).all()
@@ -27,3 +27,88 @@ def test_partc_pooled_z_pipeline(tmp_path):
     # Confirm a pooled-Z PNG was produced in the figures directory.
     pngs = list(figs.glob("prop26_zcheck_*.png"))
     assert pngs, "expected pooled-Z PNG"
+
+def test_partc_nested_checkpoints():
+    # Nested mode reads one urn per replicate at every checkpoint: the largest n
+    # reproduces the plain run at that n exactly (both engines), and smaller n
+    # share the replicate's target.
+    import pandas as pd
+    from src.prop26 import prop26_block, prop26_nested
+    from src_cli.partc_log_prop26 import simulate_rep, simulate_rep_nested
+    kw = dict(tvals=[0.3, 0.6], alpha=3.0, base="uniform", target="continuation", L=400,
+              level=0.95, z=1.959963984540054, seed=8)
+    nest = prop26_nested([20, 80, 50], M=30, **kw)
+    assert sorted(set(nest["n"])) == [20, 50, 80] and list(nest["n"]) == sorted(nest["n"])
+    last = nest[nest["n"] == 80].reset_index(drop=True)
+    pd.testing.assert_frame_equal(last, prop26_block(80, M=30, **kw), check_exact=True)
+    by_rep = nest.groupby(["rep", "t"])["Fhat"].nunique()
+    assert (by_rep == 1).all()
+
+    rows = simulate_rep_nested([80, 20], rep=2, **kw)
+    assert [r["n"] for r in rows] == [20, 20, 80, 80]
+    assert rows[2:] == simulate_rep(80, rep=2, **kw)
+    assert rows[0]["Fhat"] == rows[2]["Fhat"]
+
+def test_partc_adaptive_stopping(tmp_path):
+    # Adaptive mode stops each (n, t) cell at the coverage-SE target (or the --M
+    # cap) and the summary records the achieved M and the SEs per cell.
+    import pandas as pd
+    from src.prop26 import coverage_se
+    subprocess.run(
+        "python -m src_cli.partc_log_prop26 --alpha 5 --t 0.05 0.5 --n 50 200 --M 1200 "
+        "--seed 6 --base uniform --target exact --adaptive --coverage-se 0.012 --batch 100",
+        shell=True, check=True
+    )
+    csv = pathlib.Path("results/raw/prop26_M1200_Linf_a5.0_seed6_uniform_adaptive.csv")
+    subprocess.run(f"python -m src_cli.analyze --summary {tmp_path} --prop26 {csv}",
+                   shell=True, check=True)
+    summ = pd.read_csv(tmp_path / "prop26_summary.csv")
+    assert {"coverage_se", "width_se", "reps"} <= set(summ.columns) and len(summ) == 4
+    raw = pd.read_csv(csv)
+    for (n, t), g in raw.groupby(["n", "t"]):
+        M = len(g)
+        assert M % 100 == 0 and M <= 1200 and g["rep"].tolist() == list(range(M))
+        assert coverage_se(g["covered"].to_numpy()) <= 0.012 or M == 1200
+        row = summ[(summ["n"] == n) & (summ["t"] == t)]
+        assert abs(row["coverage_se"].item() - coverage_se(g["covered"].to_numpy())) < 1e-12
+        if M > 100:   # one batch earlier the cell was still above target
+            assert coverage_se(g["covered"].to_numpy()[:M - 100]) > 0.012
+    assert summ["reps"].nunique() > 1   # effort differs across cells
+
+def test_partc_adaptive_tail():
+    # --tail-tol stops the continuation in whole blocks, well short of the L cap;
+    # a zero tolerance runs the loop engine's tail to L on the same prefix.
+    from src.prop26 import prop26_block, tail_sd
+    from src_cli.partc_log_prop26 import simulate_rep
+    kw = dict(tvals=[0.2, 0.5], alpha=5.0, base="uniform", target="continuation", L=20000,
+              level=0.95, z=1.959963984540054, seed=4)
+    blk = prop26_block(300, M=200, tail_tol=0.1, tail_block=500, **kw)
+    used = blk["L_used"].to_numpy()
+    assert (used % 500 == 0).all() and used.max() <= 20000 and used.mean() < 0.25 * 20000
+    assert "L_used" not in prop26_block(300, M=20, **kw).columns
+    assert tail_sd(0.5, 100) == 0.05
+
+    rows = simulate_rep(60, rep=1, tail_tol=0.0, tail_block=5000, **kw)
+    plain = simulate_rep(60, rep=1, **kw)
+    assert [r.pop("L_used") for r in rows] == [20000, 20000]
+    same = lambda r: {k: v for k, v in r.items() if k not in ("Fhat", "covered")}
+    assert [same(r) for r in rows] == [same(r) for r in plain]
+
+def test_partc_rb_target():
+    # The rb target is P_{n+L}(t) of the same continuation draws: a weighted
+    # mix of P_n(t) and the continuation average F̂(t), in both engines.
+    import numpy as np
+    from src.prop26 import prop26_block
+    from src_cli.partc_log_prop26 import simulate_rep
+    kw = dict(tvals=[0.3, 0.7], alpha=2.0, base="uniform", L=700, level=0.95,
+              z=1.959963984540054, seed=5)
+    n, a, L = 90, kw["alpha"], kw["L"]
+    mix = lambda Pn, F: (Pn * (a + n) + L * F) / (a + n + L)
+    cont = prop26_block(n, M=50, target="continuation", **kw)
+    rb = prop26_block(n, M=50, target="rb", **kw)
+    assert np.allclose(rb["Fhat"], mix(cont["Pn"], cont["Fhat"]), rtol=0, atol=1e-12)
+    assert (rb["Pn"] == cont["Pn"]).all()
+
+    for c, r in zip(simulate_rep(n, rep=3, target="continuation", **kw),
+                    simulate_rep(n, rep=3, target="rb", **kw)):
+        assert abs(r["Fhat"] - mix(c["Pn"], c["Fhat"])) < 1e-12
@@ -0,0 +1,24 @@
+from pathlib import Path
+import pandas as pd
+from src.simulation import run_stream, simulate_stream
+from src.storage import read_dataset
+
+def test_dataset_append_and_subset_read(tmp_path: Path):
+    # Streams appended to one partitioned dataset read back exactly, and the
+    # reader can restrict partitions and columns.
+    root = str(tmp_path / "streams")
+    kwargs = dict(method_name="polya_dp", J=10, tmin=0.0, tmax=1.0,
+                  record_every=5, alpha=5.0, base="uniform")
+    run_stream(n=40, seed=1, out_path=root, sink="dataset", **kwargs)
+    run_stream(n=60, seed=2, out_path=root, sink="dataset", **kwargs)
+
+    df = read_dataset(root)
+    assert len(df) == 100 and df["method"].dtype == "category"
+    expect = simulate_stream(n=60, seed=2, **kwargs)
+    got = read_dataset(root, filters=[("n", "==", 60)])
+    assert list(got["n"].unique()) == [60]
+    pd.testing.assert_series_equal(got["pit"], expect["pit"])
+
+    sub = read_dataset(root, columns=["i", "d_infty"], filters=[("n", "in", [40])])
+    assert list(sub.columns) == ["i", "d_infty"] and len(sub) == 40
+    assert sorted(p.name for p in (tmp_path / "streams" / "method=polya_dp").iterdir()) == ["n=40", "n=60"]
@@ -0,0 +1,23 @@
+from pathlib import Path
+import pandas as pd, pytest, yaml
+from src_cli.sweep import seed_rule, sweep_cells, _run_cell
+
+def test_seed_rule_and_cells(tmp_path: Path):
+    # The config's seeding rule is evaluated safely and depends only on (n, rep).
+    f = seed_rule("seed = base + 1000*n + rep")
+    assert f(20251018, 500, 3) == 20251018 + 500000 + 3
+    with pytest.raises(ValueError):
+        seed_rule("seed = __import__('os').getpid()")
+
+    cfg = yaml.safe_load(open("config/polya.yaml"))
+    cfg["io"]["raw_dir"] = str(tmp_path)
+    cfg["n"] = [30, 60]
+    cells = sweep_cells(cfg, reps=2)
+    assert [(c["n"], c["seed"]) for c in cells] == [
+        (n, 20251018 + 1000*n + r) for n in (30, 60) for r in range(2)]
+    assert cells[0]["distances"] == cfg["metrics"]["distances"]  # selects MetricEngine metrics
+
+    # A cell run writes the legacy file layout.
+    out = _run_cell(cells[0])
+    assert out.endswith("polya_dp_n30_rep0.parquet")
+    assert len(pd.read_parquet(out, engine="fastparquet")) == 30